@@ -5,7 +5,7 @@ from flask import Flask
 from flask_login import current_user
 
 from app.extensions import db, login_manager
-from app.models import AdminBroadcast, AdminBroadcastView, User
+from app.models import AdminBroadcast, AdminBroadcastView, ChangeCounter, User
 from app.services.worker import start_worker
 
 
@@ -81,6 +81,8 @@ def create_app():
         _ensure_rule_columns()
         _ensure_rule_condition_columns()
         _ensure_alert_columns()
+        _ensure_broadcast_columns()
+        _ensure_change_counters()
 
     # =========================
     # Worker (opcional)
@@ -150,6 +152,7 @@ def _ensure_rule_columns():
         "score_home": "INTEGER",
         "score_away": "INTEGER",
         "second_half_only": "BOOLEAN DEFAULT 0",
+        "version": "INTEGER DEFAULT 1",
     }
 
     with db.engine.connect() as conn:
@@ -192,6 +195,35 @@ def _ensure_user_columns():
         conn.commit()
 
 
+def _ensure_broadcast_columns():
+    columns = {
+        "telegram_total": "INTEGER DEFAULT 0",
+        "telegram_sent": "INTEGER DEFAULT 0",
+        "telegram_failed": "INTEGER DEFAULT 0",
+        "telegram_report": "TEXT",
+        "telegram_progress_at": "DATETIME",
+        "telegram_finished_at": "DATETIME",
+    }
+
+    with db.engine.connect() as conn:
+        result = conn.execute(text("PRAGMA table_info('admin_broadcast')"))
+        existing = {row[1] for row in result}
+
+        for col, col_type in columns.items():
+            if col not in existing:
+                conn.execute(text(f"ALTER TABLE admin_broadcast ADD COLUMN {col} {col_type}"))
+
+        conn.commit()
+
+
+def _ensure_change_counters():
+    from app.services.rule_snapshot import RULES_COUNTER
+
+    if not db.session.get(ChangeCounter, RULES_COUNTER):
+        db.session.add(ChangeCounter(name=RULES_COUNTER, value=0))
+        db.session.commit()
+
+
 def _ensure_alert_columns():
     columns = {
         "result_minute": "INTEGER",
@@ -1,12 +1,14 @@
 from datetime import datetime, timedelta
+import json
 
-from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from sqlalchemy import case, func
 
 from ..extensions import db
 from ..models import AdminBroadcast, LoginAttempt, MatchAlert, Rule, RuleCondition, User
-from ..services.telegram import send_message
+from ..services.rule_snapshot import bump_rules_version
+from ..services.fanout import Target, close_if_stale, start_broadcast
 from ..services.worker import get_api_status
 from ..utils.time import now_sp
 
@@ -132,6 +134,10 @@ def dashboard():
             continue
         risk_users.append({"user": user, "alerts": row.alerts})
 
+    broadcasts = AdminBroadcast.query.order_by(AdminBroadcast.created_at.desc()).limit(5).all()
+    # Envio que morreu com um processo reciclado nao fica "enviando..." para sempre
+    if any([close_if_stale(item) for item in broadcasts]):
+        db.session.commit()
     return render_template(
         "admin/dashboard.html",
         total_users=total_users,
@@ -145,7 +151,7 @@ def dashboard():
         risk_users=risk_users,
         alerts_per_hour_threshold=ALERTS_PER_HOUR_THRESHOLD,
         login_attempts=LoginAttempt.query.order_by(LoginAttempt.created_at.desc()).limit(20).all(),
-        broadcasts=AdminBroadcast.query.order_by(AdminBroadcast.created_at.desc()).limit(5).all(),
+        broadcasts=broadcasts,
         api_status=get_api_status(),
     )
 
@@ -257,6 +263,7 @@ def reset_telegram(user_id):
     user = User.query.get_or_404(user_id)
     user.telegram_token = None
     user.telegram_chat_id = None
+    bump_rules_version()
     db.session.commit()
     flash("Telegram resetado para este usuario.", "success")
     return redirect(url_for("admin.user_detail", user_id=user.id))
@@ -268,6 +275,7 @@ def toggle_rule(rule_id):
     _require_admin()
     rule = Rule.query.get_or_404(rule_id)
     rule.is_active = not rule.is_active
+    bump_rules_version()
     db.session.commit()
     flash("Status da regra atualizado.", "success")
     return redirect(request.referrer or url_for("admin.dashboard"))
@@ -283,12 +291,38 @@ def broadcast():
         flash("Mensagem obrigatoria.", "warning")
         return redirect(url_for("admin.dashboard"))
     AdminBroadcast.query.update({"is_active": False})
-    db.session.add(AdminBroadcast(message=message, is_active=True))
-    db.session.commit()
+    item = AdminBroadcast(message=message, is_active=True)
+    db.session.add(item)
+    targets = []
     if send_telegram:
-        users = User.query.filter_by(telegram_verified=True).all()
-        for user in users:
-            if user.telegram_token and user.telegram_chat_id:
-                send_message(user.telegram_token, user.telegram_chat_id, message)
-    flash("Mensagem enviada para o painel.", "success")
+        targets = [
+            Target(user.username, user.telegram_token, user.telegram_chat_id)
+            for user in User.query.filter_by(telegram_verified=True).all()
+            if user.telegram_token and user.telegram_chat_id
+        ]
+        item.telegram_total = len(targets)
+    db.session.commit()
+    if targets:
+        start_broadcast(current_app._get_current_object(), item.id, targets, message)
+        flash(f"Mensagem enviada para o painel. Telegram: enviando para {len(targets)} usuarios.", "success")
+    else:
+        flash("Mensagem enviada para o painel.", "success")
     return redirect(url_for("admin.dashboard"))
+
+
+@admin_bp.route("/broadcast/<int:broadcast_id>/status")
+@login_required
+def broadcast_status(broadcast_id):
+    _require_admin()
+    item = AdminBroadcast.query.get_or_404(broadcast_id)
+    if close_if_stale(item):
+        db.session.commit()
+    return jsonify(
+        {
+            "total": item.telegram_total or 0,
+            "sent": item.telegram_sent or 0,
+            "failed": item.telegram_failed or 0,
+            "finished": item.telegram_finished_at is not None,
+            "report": json.loads(item.telegram_report) if item.telegram_report else [],
+        }
+    )
@@ -53,6 +53,7 @@ class Rule(db.Model):
     alert_on_penalty = db.Column(db.Boolean, default=False, nullable=False)
     score_home = db.Column(db.Integer)
     score_away = db.Column(db.Integer)
+    version = db.Column(db.Integer, default=1, nullable=False)
     created_at = db.Column(db.DateTime, default=now_sp, nullable=False)
     last_checked_at = db.Column(db.DateTime)
     last_match_desc = db.Column(db.String(255))
@@ -132,6 +133,12 @@ class AdminBroadcast(db.Model):
     message = db.Column(db.Text, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=now_sp, nullable=False)
+    telegram_total = db.Column(db.Integer, default=0, nullable=False)
+    telegram_sent = db.Column(db.Integer, default=0, nullable=False)
+    telegram_failed = db.Column(db.Integer, default=0, nullable=False)
+    telegram_report = db.Column(db.Text)
+    telegram_progress_at = db.Column(db.DateTime)
+    telegram_finished_at = db.Column(db.DateTime)
 
 
 class AdminBroadcastView(db.Model):
@@ -143,3 +150,51 @@ class AdminBroadcastView(db.Model):
     __table_args__ = (
         db.UniqueConstraint("broadcast_id", "user_id", name="uix_broadcast_user"),
     )
+
+
+class ChangeCounter(db.Model):
+    name = db.Column(db.String(40), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+
+class TelegramOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(255), nullable=False)
+    chat_id = db.Column(db.String(64), nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), default="pending", nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=now_sp, nullable=False)
+    created_at = db.Column(db.DateTime, default=now_sp, nullable=False)
+    sent_at = db.Column(db.DateTime)
+    latency_ms = db.Column(db.Integer)
+    last_error = db.Column(db.String(255))
+
+    __table_args__ = (db.Index("ix_telegram_outbox_status", "status", "id"),)
+
+
+class WorkerLease(db.Model):
+    worker_id = db.Column(db.String(80), primary_key=True)
+    pid = db.Column(db.Integer)
+    host = db.Column(db.String(120))
+    started_at = db.Column(db.DateTime, default=now_sp, nullable=False)
+    heartbeat_at = db.Column(db.DateTime, default=now_sp, nullable=False)
+
+
+class WorkerLock(db.Model):
+    name = db.Column(db.String(40), primary_key=True)
+    holder = db.Column(db.String(80), nullable=False)
+    pid = db.Column(db.Integer)
+    host = db.Column(db.String(120))
+    acquired_at = db.Column(db.DateTime, default=now_sp, nullable=False)
+    heartbeat_at = db.Column(db.DateTime, default=now_sp, nullable=False)
+
+
+class ScrapeStatus(db.Model):
+    # Ultima consulta a lista da BetsAPI, gravada por quem roda o worker e lida por qualquer processo web
+    name = db.Column(db.String(40), primary_key=True)
+    ok = db.Column(db.Boolean)
+    code = db.Column(db.Integer)
+    checked_at = db.Column(db.DateTime)
+    last_cycle = db.Column(db.DateTime)
+    holder = db.Column(db.String(80))
@@ -5,9 +5,10 @@ from sqlalchemy import func
 from ..extensions import db
 from ..models import MatchAlert, Rule, RuleCondition, RuleOutcomeCondition
 from ..services.evaluator import evaluate_rule, history_confidence
+from ..services.history_cache import get_match_history
+from ..services.rule_snapshot import bump_rules_version
 from ..services.scraper import (
     fetch_live_games,
-    fetch_match_history,
     fetch_match_stats,
     format_history_summary,
     is_first_half_extra_time,
@@ -274,6 +275,7 @@ def create_rule():
         for cond in outcome_green + outcome_red:
             cond.rule_id = rule.id
             db.session.add(cond)
+        bump_rules_version()
         db.session.commit()
         flash("Regra criada.", "success")
         return redirect(url_for("rules.list_rules"))
@@ -330,6 +332,7 @@ def edit_rule(rule_id):
         rule.outcome_red_if_no_green = outcome_red_if_no_green
         rule.score_home = score_home
         rule.score_away = score_away
+        rule.version = (rule.version or 0) + 1
 
         conditions = _parse_conditions(request.form)
         if not conditions:
@@ -353,6 +356,7 @@ def edit_rule(rule_id):
         for cond in outcome_green + outcome_red:
             cond.rule_id = rule.id
             db.session.add(cond)
+        bump_rules_version()
         db.session.commit()
         flash("Regra atualizada.", "success")
         return redirect(url_for("rules.list_rules"))
@@ -370,6 +374,7 @@ def delete_rule(rule_id):
             flash("Regra com muitos jogos no histórico. Informe sua senha para confirmar.", "warning")
             return redirect(url_for("rules.list_rules"))
     db.session.delete(rule)
+    bump_rules_version()
     db.session.commit()
     flash("Regra removida.", "success")
     return redirect(url_for("rules.list_rules"))
@@ -380,6 +385,7 @@ def delete_rule(rule_id):
 def toggle_rule(rule_id):
     rule = Rule.query.filter_by(id=rule_id, user_id=current_user.id).first_or_404()
     rule.is_active = not rule.is_active
+    bump_rules_version()
     db.session.commit()
     return redirect(url_for("rules.list_rules"))
 
@@ -461,7 +467,7 @@ def test_rule():
         if evaluate_rule(temp_rule, stats_for_rule):
             history_meta = {}
             try:
-                history = fetch_match_history(session, game["url"])
+                history = get_match_history(session, game["url"], game["game_id"])
                 h2h_summary = summarize_history(history.get("h2h", []))
                 home_summary = summarize_history(history.get("home", []))
                 away_summary = summarize_history(history.get("away", []))
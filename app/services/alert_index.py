@@ -0,0 +1,81 @@
+import threading
+
+from app.extensions import db
+from app.models import MatchAlert, Rule
+
+
+class AlertIndex:
+    # Pares (regra, jogo) que ja tem alerta, para nao consultar o banco a cada par do ciclo.
+    # A constraint uix_rule_game continua sendo a garantia final.
+    def __init__(self):
+        self._games = {}
+        self._stamps = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def load(self) -> None:
+        games = {}
+        for rule_id, game_id in db.session.query(MatchAlert.rule_id, MatchAlert.game_id):
+            games.setdefault(rule_id, set()).add(game_id)
+        stamps = dict(db.session.query(Rule.id, Rule.created_at))
+        with self._lock:
+            self._games = games
+            self._stamps = stamps
+            self._loaded = True
+
+    def sync(self, rules) -> None:
+        if not self._loaded:
+            self.load()
+        # Regra apagada ou desativada (a tela de regras roda em outro processo) sai aqui; se voltar, recarrega do banco
+        current = {rule.id for rule in rules}
+        with self._lock:
+            gone = [rule_id for rule_id in self._stamps if rule_id not in current]
+        for rule_id in gone:
+            self.drop_rule(rule_id)
+        for rule in rules:
+            with self._lock:
+                known = self._stamps.get(rule.id)
+            # created_at diferente: o SQLite reaproveitou o id de uma regra apagada, os pares antigos nao valem
+            if known != rule.created_at:
+                game_ids = {game_id for (game_id,) in db.session.query(MatchAlert.game_id).filter_by(rule_id=rule.id)}
+                with self._lock:
+                    self._stamps[rule.id] = rule.created_at
+                    self._games[rule.id] = game_ids
+                    self.reloads += 1
+
+    def contains(self, rule_id, game_id) -> bool:
+        with self._lock:
+            return game_id in self._games.get(rule_id, ())
+
+    def add(self, rule_id, game_id) -> None:
+        with self._lock:
+            self._games.setdefault(rule_id, set()).add(game_id)
+
+    def drop_rule(self, rule_id) -> None:
+        with self._lock:
+            self._games.pop(rule_id, None)
+            self._stamps.pop(rule_id, None)
+
+    def forget_missing(self, live_ids) -> None:
+        # Jogo que saiu da lista nao e mais avaliado; se voltar, a constraint barra o alerta repetido
+        with self._lock:
+            for rule_id, game_ids in self._games.items():
+                game_ids.intersection_update(live_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._games.clear()
+            self._stamps.clear()
+            self._loaded = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rules": len(self._games),
+                "pairs": sum(len(game_ids) for game_ids in self._games.values()),
+                "reloads": self.reloads,
+            }
+
+
+ALERT_INDEX = AlertIndex()
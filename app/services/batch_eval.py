@@ -0,0 +1,137 @@
+import os
+import threading
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - numpy e opcional
+    np = None
+
+BATCH_MIN_RULES = int(os.environ.get("WORKER_BATCH_MIN_RULES", "200"))
+OP_CODES = {">=": 0, ">": 1, "==": 2, "<=": 3, "<": 4}
+NUMPY_OPERATORS = (
+    {">=": np.greater_equal, ">": np.greater, "==": np.equal, "<=": np.less_equal, "<": np.less} if np is not None else {}
+)
+
+
+def batch_available(rule_count: int) -> bool:
+    return np is not None and rule_count >= BATCH_MIN_RULES
+
+
+class RuleMatrix:
+    # Condicoes de todas as regras em arrays: grupos contiguos por regra, condicoes contiguas por grupo
+    def __init__(self, rules, compiled):
+        self.compiled = compiled
+        self.columns = {}
+        cond_col, cond_op, cond_value = [], [], []
+        # Predicado igual (mesma coluna, operador e limiar) em varias regras e comparado uma vez so
+        unique, cond_ref = {}, []
+        group_starts, rule_starts, self.rule_index = [], [], []
+        score_home, score_away = [], []
+        for index, (rule, rule_compiled) in enumerate(zip(rules, compiled)):
+            if not rule_compiled.groups:
+                continue
+            # Regras so do 2o tempo leem a segunda metade da matriz de valores
+            offset = 1 if rule.second_half_only else 0
+            rule_starts.append(len(group_starts))
+            self.rule_index.append(index)
+            score_home.append(-1 if rule.score_home is None else rule.score_home)
+            score_away.append(-1 if rule.score_away is None else rule.score_away)
+            for conds in rule_compiled.groups:
+                group_starts.append(len(cond_ref))
+                for cond in conds:
+                    column = self.columns.setdefault((cond.stat_key, cond.side), len(self.columns))
+                    predicate = (column, offset, OP_CODES.get(cond.operator, -1), cond.value)
+                    if predicate not in unique:
+                        unique[predicate] = len(unique)
+                        cond_col.append((column, offset))
+                        cond_op.append(predicate[2])
+                        cond_value.append(cond.value)
+                    cond_ref.append(unique[predicate])
+        width = len(self.columns)
+        self.cond_col = np.array([column + offset * width for column, offset in cond_col], dtype=np.intp)
+        self.cond_op = np.array(cond_op, dtype=np.int8)
+        self.cond_value = np.array(cond_value, dtype=np.float64)
+        self.cond_ref = np.array(cond_ref, dtype=np.intp)
+        self.group_starts = np.array(group_starts, dtype=np.intp)
+        self.rule_starts = np.array(rule_starts, dtype=np.intp)
+        self.score_home = np.array(score_home, dtype=np.int64)
+        self.score_away = np.array(score_away, dtype=np.int64)
+        self.by_operator = []
+        for operator, code in OP_CODES.items():
+            positions = np.flatnonzero(self.cond_op == code)
+            if len(positions):
+                self.by_operator.append(
+                    (NUMPY_OPERATORS[operator], self.cond_col[positions], self.cond_value[positions], positions)
+                )
+
+    def values(self, rows):
+        # Chave/lado ausente ou None vira NaN: toda comparacao com NaN e falsa, como no caminho escalar
+        width = len(self.columns)
+        matrix = np.full((len(rows), 2 * width), np.nan)
+        for row_index, (full, second_half, _, _) in enumerate(rows):
+            for offset, stats in ((0, full), (width, second_half)):
+                if not stats:
+                    continue
+                for (key, side), column in self.columns.items():
+                    value = stats.get(key, {}).get(side)
+                    if isinstance(value, (int, float)):
+                        matrix[row_index, offset + column] = value
+        return matrix
+
+    def evaluate(self, rows):
+        # rows: (stats, stats do 2o tempo ou None, gols casa, gols fora) -> matriz jogos x regras
+        result = np.zeros((len(rows), len(self.compiled)), dtype=bool)
+        if not rows or not len(self.rule_starts):
+            return result
+        values = self.values(rows)
+        # Operador desconhecido fica False, como compare()
+        passed = np.zeros((len(rows), len(self.cond_col)), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for compare, columns, thresholds, positions in self.by_operator:
+                passed[:, positions] = compare(values[:, columns], thresholds)
+        groups = np.logical_and.reduceat(passed[:, self.cond_ref], self.group_starts, axis=1)
+        rules = np.logical_or.reduceat(groups, self.rule_starts, axis=1)
+        home = np.array([row[2] for row in rows], dtype=np.int64)[:, None]
+        away = np.array([row[3] for row in rows], dtype=np.int64)[:, None]
+        rules &= (self.score_home < 0) | (self.score_home == home)
+        rules &= (self.score_away < 0) | (self.score_away == away)
+        result[:, self.rule_index] = rules
+        return result
+
+
+class BatchEvaluator:
+    def __init__(self):
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.pairs = 0
+
+    def matrix(self, rules, compiled) -> RuleMatrix:
+        # Reaproveita a matriz enquanto as regras compiladas forem as mesmas (mesma versao)
+        with self._lock:
+            current = self._matrix
+            if current is None or len(current.compiled) != len(compiled) or any(
+                a is not b for a, b in zip(current.compiled, compiled)
+            ):
+                current = RuleMatrix(rules, compiled)
+                self._matrix = current
+                self.builds += 1
+            return current
+
+    def matches(self, rules, compiled, rows):
+        result = self.matrix(rules, compiled).evaluate(rows)
+        self.pairs += result.size
+        return [[rules[index] for index in row.nonzero()[0]] for row in result]
+
+    def stats(self) -> dict:
+        with self._lock:
+            matrix = self._matrix
+            return {
+                "builds": self.builds,
+                "pairs": self.pairs,
+                "conditions": len(matrix.cond_ref) if matrix else 0,
+                "unique_conditions": len(matrix.cond_col) if matrix else 0,
+            }
+
+
+BATCH_EVALUATOR = BatchEvaluator()
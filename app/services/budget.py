@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+REQUESTS_PER_MINUTE = float(os.environ.get("BETSAPI_REQUESTS_PER_MINUTE", "240"))
+BURST = float(os.environ.get("BETSAPI_BURST", "20"))
+COOLDOWN_SECONDS = float(os.environ.get("BETSAPI_COOLDOWN", "60"))
+COOLDOWN_MAX_SECONDS = float(os.environ.get("BETSAPI_COOLDOWN_MAX", "900"))
+BUDGET_MAX_WAIT = float(os.environ.get("BETSAPI_BUDGET_WAIT", "10"))
+
+# Fracao do balde que precisa sobrar para a classe gastar um token:
+# com o balde baixo so as classes mais prioritarias continuam passando.
+PRIORITY_RESERVES = {
+    "listing": 0.0,
+    "follow": 0.1,
+    "new": 0.3,
+    "finalize": 0.5,
+}
+DEFAULT_PRIORITY = "new"
+
+
+class BudgetExhausted(requests.RequestException):
+    pass
+
+
+class HostBudget:
+    def __init__(self, per_minute=None, burst=None):
+        self.rate = (REQUESTS_PER_MINUTE if per_minute is None else per_minute) / 60.0
+        self.capacity = max(1.0, BURST if burst is None else burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.spent = {}
+        self.denied = {}
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=DEFAULT_PRIORITY, timeout=None) -> bool:
+        reserve = PRIORITY_RESERVES.get(priority, PRIORITY_RESERVES[DEFAULT_PRIORITY]) * self.capacity
+        deadline = time.monotonic() + (BUDGET_MAX_WAIT if timeout is None else timeout)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.cooldown_until:
+                    wait_for = self.cooldown_until - now
+                elif self.tokens - 1 >= reserve:
+                    self.tokens -= 1
+                    self.spent[priority] = self.spent.get(priority, 0) + 1
+                    return True
+                else:
+                    wait_for = (reserve + 1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+                if now + wait_for > deadline:
+                    self.denied[priority] = self.denied.get(priority, 0) + 1
+                    return False
+                self._cond.wait(wait_for)
+
+    def report(self, status_code: int, retry_after=None) -> None:
+        with self._cond:
+            if status_code in (403, 429):
+                self.strikes += 1
+                cooldown = min(COOLDOWN_MAX_SECONDS, COOLDOWN_SECONDS * 2 ** (self.strikes - 1))
+                if retry_after:
+                    cooldown = max(cooldown, min(COOLDOWN_MAX_SECONDS, retry_after))
+                self.cooldown_until = time.monotonic() + cooldown
+                self.tokens = 0.0
+            elif status_code < 400:
+                self.strikes = 0
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "tokens": round(self.tokens, 1),
+                "cooldown": round(max(0.0, self.cooldown_until - now), 1),
+                "strikes": self.strikes,
+                "spent": dict(self.spent),
+                "denied": dict(self.denied),
+            }
+
+
+BUDGETS = {}
+BUDGETS_LOCK = threading.Lock()
+
+
+def host_budget(url: str) -> HostBudget:
+    host = urlparse(url).netloc
+    with BUDGETS_LOCK:
+        budget = BUDGETS.get(host)
+        if budget is None:
+            budget = BUDGETS[host] = HostBudget()
+        return budget
+
+
+def _retry_after(resp):
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def budgeted_get(session, url, headers=None, priority=DEFAULT_PRIORITY, timeout=15, budget_wait=None):
+    budget = host_budget(url)
+    if not budget.acquire(priority, budget_wait):
+        raise BudgetExhausted(f"sem orcamento de requisicoes para {urlparse(url).netloc} ({priority})")
+    resp = session.get(url, headers=headers, timeout=timeout)
+    budget.report(resp.status_code, _retry_after(resp))
+    return resp
+
+
+def budget_stats() -> dict:
+    with BUDGETS_LOCK:
+        budgets = dict(BUDGETS)
+    return {host: budget.stats() for host, budget in budgets.items()}
@@ -0,0 +1,89 @@
+import threading
+
+
+def condition_is_dead(cond, stats: dict) -> bool:
+    # Contador acima do limite de "<", "<=" ou "==" so tende a subir: a condicao nao volta a valer
+    current = stats.get(cond.stat_key, {}).get(cond.side)
+    if current is None:
+        return False
+    if cond.operator == "<":
+        return current >= cond.value
+    return current > cond.value
+
+
+class DeadGroups:
+    # Por jogo e regra: grupos que ja nao podem mais disparar. Zera quando o placar volta (gol anulado).
+    def __init__(self):
+        self._games = {}
+        self._scores = {}
+        self._lock = threading.Lock()
+        self.killed = 0
+        self.skipped = 0
+
+    def live(self, game_id, rule_id, compiled):
+        with self._lock:
+            entry = self._games.get(game_id, {}).get(rule_id)
+            # Regra recompilada (editada) descarta as marcas antigas
+            if entry is None or entry[0] is not compiled:
+                return compiled.groups
+            if not entry[1]:
+                self.skipped += 1
+            return entry[1]
+
+    def update(self, game_id, rule_id, compiled, stats: dict) -> None:
+        if not any(compiled.killers):
+            return
+        with self._lock:
+            rules = self._games.setdefault(game_id, {})
+            entry = rules.get(rule_id)
+            dead = entry[2] if entry and entry[0] is compiled else frozenset()
+            newly = {
+                index
+                for index, killers in enumerate(compiled.killers)
+                if index not in dead and any(condition_is_dead(cond, stats) for cond in killers)
+            }
+            if not newly:
+                return
+            dead = dead | newly
+            live = tuple(group for index, group in enumerate(compiled.groups) if index not in dead)
+            rules[rule_id] = (compiled, live, dead)
+            self.killed += len(newly)
+
+    def observe_score(self, game_id, home: int, away: int) -> None:
+        with self._lock:
+            last = self._scores.get(game_id)
+            self._scores[game_id] = (home, away)
+        if last and (home < last[0] or away < last[1]):
+            self.reset(game_id)
+
+    def reset(self, game_id) -> None:
+        with self._lock:
+            self._games.pop(game_id, None)
+
+    def forget_missing(self, live_ids) -> None:
+        with self._lock:
+            for game_id in list(self._games):
+                if game_id not in live_ids:
+                    self._games.pop(game_id, None)
+            for game_id in list(self._scores):
+                if game_id not in live_ids:
+                    self._scores.pop(game_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._games.clear()
+            self._scores.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = [entry for rules in self._games.values() for entry in rules.values()]
+            return {
+                "games": len(self._games),
+                "dead_pairs": sum(1 for entry in entries if not entry[1]),
+                "dead_groups": sum(len(entry[2]) for entry in entries),
+                "killed": self.killed,
+                "skipped": self.skipped,
+            }
+
+
+DEAD_GROUPS = DeadGroups()
@@ -1,7 +1,32 @@
 import json
+import operator
+import threading
+from typing import NamedTuple
 
 from .scraper import normalize_stat_key
 
+# Contadores que so crescem durante o jogo (gol anulado e tratado a parte)
+MONOTONIC_KEYS = {
+    "On Target",
+    "Off Target",
+    "Corners",
+    "Dangerous Attacks",
+    "Attacks",
+    "Goals",
+    "Penalties",
+    "Yellow Card",
+    "Red Card",
+    "Minute",
+}
+UPPER_BOUNDS = ("<", "<=", "==")
+OPERATORS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "==": operator.eq,
+    "<=": operator.le,
+    "<": operator.lt,
+}
+
 
 def compare(op: str, left: int, right: int) -> bool:
     if op == ">=":
@@ -17,37 +42,177 @@ def compare(op: str, left: int, right: int) -> bool:
     return False
 
 
-def evaluate_conditions(conditions, stats: dict) -> bool:
-    if not conditions:
-        return False
-    for cond in conditions:
-        key = normalize_stat_key(cond.stat_key)
-        if key not in stats:
-            return False
-        side_values = stats[key]
-        if cond.side not in side_values:
-            return False
-        value = side_values[cond.side]
-        if value is None:
-            return False
-        if not compare(cond.operator, value, cond.value):
-            return False
-    return True
+def evaluate_rule(rule, stats: dict) -> bool:
+    return evaluate_groups(compile_rule(rule).groups, stats)
 
 
-def evaluate_rule(rule, stats: dict) -> bool:
-    if not rule.conditions:
-        return False
+def _never(left, right) -> bool:
+    return False
+
+
+class CompiledCondition(NamedTuple):
+    stat_key: str
+    side: str
+    operator: str
+    value: int
+    test: object
+
+
+class CompiledRule(NamedTuple):
+    groups: tuple
+    green: tuple
+    red: tuple
+    # Por grupo: condicoes que, depois de falhar, nunca mais valem no mesmo jogo
+    killers: tuple
+    # Chaves de stats lidas pelos grupos e pelas condicoes de green/red
+    reads: frozenset
+    outcome_reads: frozenset
+
+
+def _identity(value):
+    return value
+
+
+def compile_conditions(conditions, intern=_identity) -> tuple:
+    return tuple(
+        intern(
+            CompiledCondition(
+                normalize_stat_key(cond.stat_key),
+                cond.side,
+                cond.operator,
+                cond.value,
+                OPERATORS.get(cond.operator, _never),
+            )
+        )
+        for cond in conditions
+    )
+
+
+def compile_rule(rule, intern=_identity) -> CompiledRule:
     groups = {}
-    for cond in rule.conditions:
+    for cond in rule.conditions or []:
         gid = cond.group_id if cond.group_id is not None else 0
         groups.setdefault(gid, []).append(cond)
+    outcomes = rule.outcome_conditions or []
+    green = compile_conditions((c for c in outcomes if c.outcome_type == "green"), intern)
+    red = compile_conditions((c for c in outcomes if c.outcome_type == "red"), intern)
+    compiled_groups = []
     for conds in groups.values():
-        if evaluate_conditions(conds, stats):
+        # E dentro do grupo nao depende da ordem: ordenar deixa grupos iguais de regras diferentes identicos
+        compiled = sorted(compile_conditions(conds, intern), key=lambda cond: cond[:4])
+        compiled_groups.append(intern(tuple(compiled)))
+    return CompiledRule(
+        groups=tuple(compiled_groups),
+        killers=tuple(
+            tuple(cond for cond in group if cond.stat_key in MONOTONIC_KEYS and cond.operator in UPPER_BOUNDS)
+            for group in compiled_groups
+        ),
+        green=green,
+        red=red,
+        reads=frozenset(cond.stat_key for group in compiled_groups for cond in group),
+        outcome_reads=frozenset(cond.stat_key for cond in green + red),
+    )
+
+
+def evaluate_compiled(conditions, stats: dict) -> bool:
+    # Chave ja normalizada e operador ja resolvido em compile_rule; falta de chave ou lado e False
+    if not conditions:
+        return False
+    for key, side, _, value, test in conditions:
+        current = stats.get(key, {}).get(side)
+        if current is None or not test(current, value):
+            return False
+    return True
+
+
+def evaluate_groups(groups, stats: dict) -> bool:
+    # Sem memo entre regras: com as contagens em que o worker usa o caminho escalar, guardar resultado por
+    # grupo ou por condicao custa mais que a comparacao. O lote NumPy ja compara cada condicao unica uma vez
+    for conditions in groups:
+        if evaluate_compiled(conditions, stats):
             return True
     return False
 
 
+class CompiledRuleCache:
+    # Compila cada regra uma vez; a versao gravada pela tela de regras invalida a entrada.
+    # Condicoes e grupos iguais entre regras (de qualquer usuario) viram o mesmo objeto:
+    # milhares de regras montadas dos mesmos modelos ocupam a memoria de poucas.
+    def __init__(self):
+        self._items = {}
+        self._pool = {}
+        self._orphaned = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.compiles = 0
+
+    def _intern(self, value):
+        return self._pool.setdefault(value, value)
+
+    def get(self, rule) -> CompiledRule:
+        # created_at entra no carimbo porque o SQLite pode reaproveitar o id de uma regra apagada
+        stamp = (rule.version, rule.created_at)
+        with self._lock:
+            entry = self._items.get(rule.id)
+            if entry and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+        with self._lock:
+            compiled = compile_rule(rule, self._intern)
+            self._orphaned = self._orphaned or rule.id in self._items
+            self._items[rule.id] = (stamp, compiled)
+            self.compiles += 1
+        return compiled
+
+    def retain(self, rule_ids) -> None:
+        with self._lock:
+            removed = [rule_id for rule_id in self._items if rule_id not in rule_ids]
+            for rule_id in removed:
+                self._items.pop(rule_id, None)
+            if removed or self._orphaned:
+                self._rebuild_pool()
+
+    def _rebuild_pool(self) -> None:
+        # Edicoes deixam entradas orfas no pool; so o que as regras em cache ainda usam fica
+        pool = {}
+        for _, compiled in self._items.values():
+            for group in compiled.groups:
+                pool[group] = group
+                for cond in group:
+                    pool[cond] = cond
+            for cond in compiled.green + compiled.red:
+                pool[cond] = cond
+        self._pool = pool
+        self._orphaned = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._pool.clear()
+            self._orphaned = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            groups = [group for _, compiled in self._items.values() for group in compiled.groups]
+            conditions = [cond for group in groups for cond in group]
+            unique_groups = len({id(group) for group in groups})
+            unique_conditions = len({id(cond) for cond in conditions})
+            return {
+                "rules": len(self._items),
+                "hits": self.hits,
+                "compiles": self.compiles,
+                "conditions": len(conditions),
+                "unique_conditions": unique_conditions,
+                "groups": len(groups),
+                "unique_groups": unique_groups,
+                "condition_dedup": round(1 - unique_conditions / len(conditions), 3) if conditions else 0,
+                "group_dedup": round(1 - unique_groups / len(groups), 3) if groups else 0,
+            }
+
+
+COMPILED_RULES = CompiledRuleCache()
+
+
 class _SafeDict(dict):
     def __missing__(self, key):
         return ""
@@ -1,14 +1,39 @@
 import os
 import json
+from contextlib import contextmanager
 
 import pandas as pd
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sem lock entre processos
+    fcntl = None
+
 
 def _ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
+@contextmanager
+def _file_lock(path: str):
+    # Cada processo de worker (shards) tem seu export: um upsert por vez em cada planilha
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
 def _upsert_excel(path: str, row: dict, key_field: str):
+    with _file_lock(path):
+        _upsert_locked(path, row, key_field)
+
+
+def _upsert_locked(path: str, row: dict, key_field: str):
     if os.path.exists(path):
         try:
             df = pd.read_excel(path)
@@ -22,7 +47,11 @@ def _upsert_excel(path: str, row: dict, key_field: str):
         df.loc[df[key_field] == row[key_field], list(row.keys())] = list(row.values())
     else:
         df = pd.concat([df, pd.DataFrame([row])], ignore_index=True, sort=False)
-    df.to_excel(path, index=False)
+    # Grava ao lado e troca: quem ler (ou um processo que morrer no meio) nunca ve a planilha pela metade
+    root, ext = os.path.splitext(path)
+    partial = f"{root}.{os.getpid()}.tmp{ext}"
+    df.to_excel(partial, index=False)
+    os.replace(partial, path)
 
 
 def _flatten_stats(prefix: str, stats_json: str | None) -> dict:
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import NamedTuple
+
+from app.extensions import db
+from app.models import AdminBroadcast
+from app.utils.time import now_sp
+
+from .scraper import make_session
+from .telegram import post_message
+
+FANOUT_IN_FLIGHT = int(os.environ.get("TELEGRAM_FANOUT_IN_FLIGHT", "16"))
+# Sem progresso gravado por esse tempo o envio morreu com o processo (cada requisicao tem timeout de 15s)
+FANOUT_STALE_SECONDS = int(os.environ.get("TELEGRAM_FANOUT_STALE", "120"))
+PROGRESS_SECONDS = 0.5
+
+
+class Target(NamedTuple):
+    recipient: str
+    token: str
+    chat_id: str
+
+
+def fan_out(targets, text: str, max_in_flight=None, on_result=None) -> list:
+    # Mesma mensagem para varios (token, chat_id) em paralelo, no maximo max_in_flight requisicoes por vez.
+    # Relatorio na ordem dos alvos: {"recipient", "ok", "detail", "ms"}
+    targets = list(targets)
+    report = [None] * len(targets)
+    if not targets:
+        return report
+    local = threading.local()
+
+    def send(target):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = make_session()
+        started = time.monotonic()
+        status, detail = post_message(session, target.token, target.chat_id, text)
+        return {
+            "recipient": target.recipient,
+            "ok": status == 200,
+            "detail": detail,
+            "ms": int((time.monotonic() - started) * 1000),
+        }
+
+    workers = max(1, min(max_in_flight or FANOUT_IN_FLIGHT, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout") as pool:
+        futures = {pool.submit(send, target): index for index, target in enumerate(targets)}
+        for future in as_completed(futures):
+            try:
+                entry = future.result()
+            except Exception as exc:
+                entry = {"recipient": targets[futures[future]].recipient, "ok": False, "detail": str(exc), "ms": None}
+            report[futures[future]] = entry
+            if on_result:
+                on_result(entry)
+    return report
+
+
+def start_broadcast(app, broadcast_id: int, targets, text: str) -> None:
+    # A rota responde na hora; o progresso fica gravado na linha do AdminBroadcast
+    threading.Thread(
+        target=_run_broadcast, args=(app, broadcast_id, list(targets), text), name="broadcast", daemon=True
+    ).start()
+
+
+def _run_broadcast(app, broadcast_id: int, targets, text: str) -> None:
+    with app.app_context():
+        counts = {"sent": 0, "failed": 0}
+        flushed = [time.monotonic()]
+
+        def save(**extra) -> None:
+            AdminBroadcast.query.filter_by(id=broadcast_id).update(
+                {
+                    "telegram_sent": counts["sent"],
+                    "telegram_failed": counts["failed"],
+                    "telegram_progress_at": now_sp(),
+                    **extra,
+                }
+            )
+            db.session.commit()
+
+        def on_result(entry) -> None:
+            counts["sent" if entry["ok"] else "failed"] += 1
+            if time.monotonic() - flushed[0] >= PROGRESS_SECONDS:
+                flushed[0] = time.monotonic()
+                save()
+
+        try:
+            report = fan_out(targets, text, on_result=on_result)
+            save(telegram_report=json.dumps(report, ensure_ascii=False), telegram_finished_at=now_sp())
+        except Exception as exc:
+            db.session.rollback()
+            print(f"[broadcast] erro: {exc}")
+            save(telegram_finished_at=now_sp())
+        finally:
+            db.session.remove()
+
+
+def close_if_stale(item) -> bool:
+    # A thread do envio e daemon do processo web: se ele for reciclado no meio, ninguem grava o fim.
+    # Sem progresso ha FANOUT_STALE_SECONDS o que faltou conta como falha e o broadcast e encerrado
+    if item.telegram_finished_at is not None or not item.telegram_total:
+        return False
+    last = item.telegram_progress_at or item.created_at
+    if now_sp() - last < timedelta(seconds=FANOUT_STALE_SECONDS):
+        return False
+    missing = max(0, item.telegram_total - (item.telegram_sent or 0) - (item.telegram_failed or 0))
+    report = json.loads(item.telegram_report) if item.telegram_report else []
+    if missing:
+        report.append({"recipient": f"{missing} usuarios", "ok": False, "detail": "envio interrompido", "ms": None})
+    item.telegram_failed = (item.telegram_failed or 0) + missing
+    item.telegram_report = json.dumps(report, ensure_ascii=False)
+    item.telegram_finished_at = now_sp()
+    return True
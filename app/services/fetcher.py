@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from urllib.parse import urlparse
+
+from .scraper import download_match_page, fetch_match_stats, make_session
+
+MAX_IN_FLIGHT = int(os.environ.get("WORKER_MAX_IN_FLIGHT", "8"))
+HOST_INTERVAL = float(os.environ.get("WORKER_HOST_INTERVAL", "0.25"))
+
+
+class FetchEngine:
+    def __init__(self, max_in_flight=None, host_interval=None, session_factory=make_session):
+        self.max_in_flight = max(1, max_in_flight or MAX_IN_FLIGHT)
+        self.host_interval = HOST_INTERVAL if host_interval is None else host_interval
+        self._session_factory = session_factory
+        self._local = threading.local()
+        self._host_lock = threading.Lock()
+        self._host_next = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="fetch")
+
+    def _session(self):
+        # requests.Session nao e thread-safe: uma sessao por thread do pool
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._session_factory()
+            self._local.session = session
+        return session
+
+    def _pace(self, url: str) -> None:
+        if self.host_interval <= 0:
+            return
+        host = urlparse(url).netloc
+        with self._host_lock:
+            now = time.monotonic()
+            slot = max(now, self._host_next.get(host, now))
+            self._host_next[host] = slot + self.host_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _run(self, fn, url: str):
+        self._pace(url)
+        try:
+            return fn(self._session(), url)
+        except Exception as exc:
+            print(f"[fetch] erro em {url}: {exc}")
+            return None
+
+    def map_unordered(self, fn, items, url_of):
+        pending = {}
+        source = iter(items)
+
+        def submit_next() -> bool:
+            for item in source:
+                pending[self._executor.submit(self._run, fn, url_of(item))] = item
+                return True
+            return False
+
+        for _ in range(self.max_in_flight):
+            if not submit_next():
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                submit_next()
+                yield item, future.result()
+
+    def fetch_stats(self, games, priority="new"):
+        fetch = partial(fetch_match_stats, priority=priority)
+        return self.map_unordered(fetch, games, lambda game: game["url"])
+
+    def download(self, url: str, priority="new"):
+        # Na thread de quem chama (etapa de fetch do worker), com o mesmo ritmo por host e sessao por thread
+        return self._run(partial(download_match_page, priority=priority), url)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
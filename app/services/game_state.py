@@ -0,0 +1,108 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+GAME_STATE_PATH = os.environ.get("GAME_STATE_PATH", "data/game_state.db")
+GAME_STATE_TTL = int(os.environ.get("GAME_STATE_TTL", "14400"))
+PURGE_SECONDS = 3600
+
+
+class GameStateStore:
+    # Estado por jogo do worker (baseline do 2o tempo, intervalo, penaltis) em SQLite, uma linha JSON por jogo.
+    # save() grava so os jogos que mudaram desde a ultima chamada e apaga os que este processo largou,
+    # se a linha ainda for a que ele gravou (jogo que foi para outro shard pode ja ter sido regravado pelo dono novo);
+    # load() devolve o que foi salvo ha menos de GAME_STATE_TTL para o worker voltar de onde parou.
+    def __init__(self, path=None, ttl=None):
+        self.path = path or GAME_STATE_PATH
+        self.ttl = GAME_STATE_TTL if ttl is None else ttl
+        self._saved = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._purged_at = 0.0
+        self.loaded = 0
+        self.written = 0
+        self.deleted = 0
+        self.save_ms = None
+
+    def _connect(self):
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS game_state ("
+                "game_id TEXT PRIMARY KEY, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def load(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT game_id, payload FROM game_state WHERE updated_at >= ?", (time.time() - self.ttl,)
+            ).fetchall()
+            states = {}
+            for game_id, payload in rows:
+                try:
+                    states[game_id] = json.loads(payload)
+                except ValueError:
+                    continue
+            # Nao entra em _saved: com varios processos so apaga as linhas dos jogos que ele mesmo gravou
+            self.loaded = len(states)
+            return states
+
+    def save(self, states: dict) -> int:
+        started = time.monotonic()
+        with self._lock:
+            changed = [(game_id, state) for game_id, state in states.items() if self._saved.get(game_id, (None,))[0] != state]
+            dropped = [game_id for game_id in self._saved if game_id not in states]
+            if changed or dropped:
+                now = time.time()
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO game_state (game_id, payload, updated_at) VALUES (?, ?, ?)",
+                    [(game_id, json.dumps(state, separators=(",", ":")), now) for game_id, state in changed],
+                )
+                removed = conn.executemany(
+                    "DELETE FROM game_state WHERE game_id = ? AND updated_at = ?",
+                    [(game_id, self._saved[game_id][1]) for game_id in dropped],
+                )
+                conn.commit()
+                for game_id, state in changed:
+                    self._saved[game_id] = (state, now)
+                for game_id in dropped:
+                    self._saved.pop(game_id, None)
+                self.written += len(changed)
+                self.deleted += max(0, removed.rowcount)
+            self._purge()
+            self.save_ms = round((time.monotonic() - started) * 1000, 1)
+            return len(changed)
+
+    def _purge(self) -> None:
+        # Linhas de jogos que ninguem mais atualiza (acabaram, ou eram de outro processo)
+        if time.monotonic() - self._purged_at < PURGE_SECONDS:
+            return
+        self._purged_at = time.monotonic()
+        conn = self._connect()
+        conn.execute("DELETE FROM game_state WHERE updated_at < ?", (time.time() - self.ttl,))
+        conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._saved.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "games": len(self._saved),
+                "loaded": self.loaded,
+                "written": self.written,
+                "deleted": self.deleted,
+                "save_ms": self.save_ms,
+            }
+
+
+GAME_STATE = GameStateStore()
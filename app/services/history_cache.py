@@ -0,0 +1,134 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .scraper import fetch_match_history
+
+HISTORY_CACHE_PATH = os.environ.get("HISTORY_CACHE_PATH", "data/history_cache.db")
+HISTORY_CACHE_TTL = int(os.environ.get("HISTORY_CACHE_TTL", "43200"))
+HISTORY_CACHE_MAX = int(os.environ.get("HISTORY_CACHE_MAX", "5000"))
+HISTORY_CACHE_WARM = int(os.environ.get("HISTORY_CACHE_WARM", "500"))
+
+
+def _game_id_from_url(url: str):
+    match = re.search(r"/r/(\d+)", url or "")
+    return match.group(1) if match else None
+
+
+class HistoryCache:
+    def __init__(self, path=None, ttl=None, max_entries=None, memory_entries=None):
+        self.path = path or HISTORY_CACHE_PATH
+        self.ttl = HISTORY_CACHE_TTL if ttl is None else ttl
+        self.max_entries = HISTORY_CACHE_MAX if max_entries is None else max_entries
+        self.memory_entries = HISTORY_CACHE_WARM if memory_entries is None else memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_cache ("
+                "game_id TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_history_cache_access ON history_cache (last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, game_id: str, fetched_at: float, history: dict) -> None:
+        self._memory[game_id] = (fetched_at, history)
+        self._memory.move_to_end(game_id)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def warm(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT game_id, payload, fetched_at FROM history_cache "
+                "WHERE fetched_at >= ? ORDER BY last_access DESC LIMIT ?",
+                (time.time() - self.ttl, self.memory_entries),
+            ).fetchall()
+            for game_id, payload, fetched_at in reversed(rows):
+                try:
+                    self._remember(game_id, fetched_at, json.loads(payload))
+                except ValueError:
+                    continue
+            return len(rows)
+
+    def get(self, game_id: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(game_id)
+            if entry is None:
+                row = self._connect().execute(
+                    "SELECT payload, fetched_at FROM history_cache WHERE game_id = ?", (game_id,)
+                ).fetchone()
+                if row:
+                    try:
+                        entry = (row[1], json.loads(row[0]))
+                    except ValueError:
+                        entry = None
+            if entry is None or now - entry[0] > self.ttl:
+                self._memory.pop(game_id, None)
+                self.misses += 1
+                return None
+            self._remember(game_id, entry[0], entry[1])
+            conn = self._connect()
+            conn.execute("UPDATE history_cache SET last_access = ? WHERE game_id = ?", (now, game_id))
+            conn.commit()
+            self.hits += 1
+            return entry[1]
+
+    def put(self, game_id: str, history: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(game_id, now, history)
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO history_cache (game_id, payload, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (game_id, json.dumps(history), now, now),
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM history_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM history_cache WHERE game_id IN ("
+                    "SELECT game_id FROM history_cache ORDER BY last_access ASC LIMIT ?)",
+                    (excess,),
+                )
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"memory": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+
+HISTORY_CACHE = HistoryCache()
+
+
+def get_match_history(session, match_url: str, game_id=None):
+    game_id = game_id or _game_id_from_url(match_url)
+    if not game_id:
+        return fetch_match_history(session, match_url)
+    cached = HISTORY_CACHE.get(game_id)
+    if cached is not None:
+        return cached
+    history = fetch_match_history(session, match_url)
+    # Resposta vazia pode ser erro/anti-bot: nao fixa no cache
+    if any(history.get(key) for key in ("h2h", "home", "away")):
+        HISTORY_CACHE.put(game_id, history)
+    return history
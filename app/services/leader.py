@@ -0,0 +1,128 @@
+import atexit
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import WorkerLock
+from app.utils.time import now_sp
+
+LOCK_TTL = int(os.environ.get("WORKER_LOCK_TTL", "30"))
+LOCK_HEARTBEAT = float(os.environ.get("WORKER_LOCK_HEARTBEAT", "5"))
+
+
+class LeaderLock:
+    # Linha em worker_lock que so um processo segura por vez. Com gunicorn (ou qualquer servidor com
+    # varios processos) todos chamam create_app, mas so o dono da linha roda o worker; os outros
+    # ficam tentando e assumem quando o heartbeat do dono passa de LOCK_TTL.
+    def __init__(self, name: str = "worker"):
+        self.name = name
+        self.holder_id = None
+        self.held = False
+        self._app = None
+        self._started = False
+
+    def start(self, app, run) -> None:
+        # run(app) sobe numa thread na primeira vez que o lock e pego; depois so o flag held muda
+        if self._started:
+            return
+        self._started = True
+        self._app = app
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        threading.Thread(target=self._loop, args=(run,), name="worker-lock", daemon=True).start()
+        atexit.register(self.release)
+
+    def _loop(self, run) -> None:
+        runner = None
+        with self._app.app_context():
+            while True:
+                if runner is not None and not runner.is_alive():
+                    # O worker morreu (erro fora do try do ciclo): solta o lock em vez de renovar um lock
+                    # sem ninguem trabalhando; outro processo (ou este, na proxima volta) sobe um worker novo
+                    print(f"[worker] thread do worker parou em {self.holder_id}, liberando o lock")
+                    runner = None
+                    self.release()
+                    # Uma volta sem tentar: os outros processos tem a chance de assumir primeiro
+                    time.sleep(LOCK_HEARTBEAT)
+                    continue
+                try:
+                    held = self.try_acquire()
+                except Exception as exc:
+                    db.session.rollback()
+                    held = False
+                    print(f"[worker] erro no lock: {exc}")
+                finally:
+                    db.session.remove()
+                if held != self.held:
+                    print(f"[worker] lock do worker {'com' if held else 'perdido por'} {self.holder_id}")
+                    self.held = held
+                if held and runner is None:
+                    runner = threading.Thread(target=run, args=(self._app,), name="worker", daemon=True)
+                    runner.start()
+                time.sleep(LOCK_HEARTBEAT)
+
+    def try_acquire(self) -> bool:
+        now = now_sp()
+        values = {"holder": self.holder_id, "pid": os.getpid(), "host": socket.gethostname(), "heartbeat_at": now}
+        if not self.held:
+            values["acquired_at"] = now
+        # Renova se ja e nosso, toma se o dono parou de bater; um UPDATE so, entao dois processos nao ganham juntos
+        taken = WorkerLock.query.filter(
+            WorkerLock.name == self.name,
+            or_(WorkerLock.holder == self.holder_id, WorkerLock.heartbeat_at < now - timedelta(seconds=LOCK_TTL)),
+        ).update(values, synchronize_session=False)
+        if taken:
+            db.session.commit()
+            return True
+        if db.session.get(WorkerLock, self.name) is not None:
+            db.session.rollback()
+            return False
+        try:
+            db.session.add(WorkerLock(name=self.name, **values))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Outro processo criou a linha primeiro
+            db.session.rollback()
+            return False
+
+    def allows(self) -> bool:
+        # Sem start() (worker_main, bench) nao ha disputa
+        return self.held or not self._started
+
+    def release(self) -> None:
+        # Saida limpa: o proximo processo assume na proxima tentativa, sem esperar o TTL
+        if not self.held or self._app is None:
+            return
+        self.held = False
+        try:
+            with self._app.app_context():
+                WorkerLock.query.filter_by(name=self.name, holder=self.holder_id).update(
+                    {"heartbeat_at": now_sp() - timedelta(seconds=LOCK_TTL + 1)}, synchronize_session=False
+                )
+                db.session.commit()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        # Lido do banco: qualquer processo do servidor web responde quem esta com o worker
+        row = db.session.get(WorkerLock, self.name)
+        alive = row is not None and row.heartbeat_at >= now_sp() - timedelta(seconds=LOCK_TTL)
+        return {
+            "holder": row.holder if row else None,
+            "pid": row.pid if row else None,
+            "host": row.host if row else None,
+            "since": row.acquired_at.strftime("%Y-%m-%d %H:%M:%S") if row else None,
+            "heartbeat_at": row.heartbeat_at.strftime("%Y-%m-%d %H:%M:%S") if row else None,
+            "alive": alive,
+            "this_process": bool(alive and row.holder == self.holder_id),
+        }
+
+
+WORKER_LOCK = LeaderLock()
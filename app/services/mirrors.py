@@ -0,0 +1,88 @@
+import os
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+MIRROR_WINDOW = int(os.environ.get("BETSAPI_MIRROR_WINDOW", "50"))
+MIRROR_MIN_SAMPLES = int(os.environ.get("BETSAPI_MIRROR_MIN_SAMPLES", "5"))
+HEDGE_PERCENTILE = float(os.environ.get("BETSAPI_HEDGE_PERCENTILE", "0.9"))
+HEDGE_MIN_SECONDS = float(os.environ.get("BETSAPI_HEDGE_MIN", "0.3"))
+# Peso de um erro no placar do espelho, em segundos de latencia
+ERROR_PENALTY_SECONDS = 5.0
+
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc
+
+
+class MirrorHealth:
+    def __init__(self, window=None):
+        self.window = window or MIRROR_WINDOW
+        self._samples = {}
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, url: str, latency: float, ok: bool) -> None:
+        host = _host(url)
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append((latency, ok))
+
+    def record_hedge(self, won: bool) -> None:
+        with self._lock:
+            self.hedged += 1
+            if won:
+                self.hedge_wins += 1
+
+    def _percentile(self, samples, pct: float):
+        latencies = sorted(latency for latency, ok in samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(pct * (len(latencies) - 1))))
+        return latencies[index]
+
+    def score(self, url: str) -> float:
+        with self._lock:
+            samples = list(self._samples.get(_host(url), ()))
+        if not samples:
+            return 0.0
+        error_rate = sum(1 for _, ok in samples if not ok) / len(samples)
+        median = self._percentile(samples, 0.5)
+        return error_rate * ERROR_PENALTY_SECONDS + (median if median is not None else ERROR_PENALTY_SECONDS)
+
+    def order(self, urls):
+        # sorted e estavel: com placar igual vale a ordem configurada
+        return sorted(urls, key=self.score)
+
+    def hedge_delay(self, url: str):
+        with self._lock:
+            samples = list(self._samples.get(_host(url), ()))
+        if len(samples) < MIRROR_MIN_SAMPLES:
+            return None
+        delay = self._percentile(samples, HEDGE_PERCENTILE)
+        if delay is None:
+            return HEDGE_MIN_SECONDS
+        return max(HEDGE_MIN_SECONDS, delay)
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = {host: list(samples) for host, samples in self._samples.items()}
+            hedged, wins = self.hedged, self.hedge_wins
+        result = {"hedged": hedged, "hedge_wins": wins, "hosts": {}}
+        for host, samples in snapshot.items():
+            errors = sum(1 for _, ok in samples if not ok)
+            p50 = self._percentile(samples, 0.5)
+            p90 = self._percentile(samples, HEDGE_PERCENTILE)
+            result["hosts"][host] = {
+                "samples": len(samples),
+                "error_rate": round(errors / len(samples), 2) if samples else 0,
+                "p50": round(p50, 3) if p50 is not None else None,
+                "p90": round(p90, 3) if p90 is not None else None,
+            }
+        return result
+
+
+MIRRORS = MirrorHealth()
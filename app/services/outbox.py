@@ -0,0 +1,227 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import TelegramOutbox
+from app.utils.time import now_sp
+
+from .scraper import make_session
+from .telegram import post_message
+
+DISPATCH_THREADS = int(os.environ.get("TELEGRAM_DISPATCH_THREADS", "4"))
+# Limites do Telegram: ~1 mensagem/s no mesmo chat e ~30/s por bot
+CHAT_INTERVAL = float(os.environ.get("TELEGRAM_CHAT_INTERVAL", "1.0"))
+BOT_RATE = float(os.environ.get("TELEGRAM_BOT_RATE", "30"))
+MAX_ATTEMPTS = int(os.environ.get("TELEGRAM_MAX_ATTEMPTS", "6"))
+RETRY_BASE = float(os.environ.get("TELEGRAM_RETRY_BASE", "2"))
+RETRY_MAX = float(os.environ.get("TELEGRAM_RETRY_MAX", "300"))
+OUTBOX_KEEP_DAYS = int(os.environ.get("TELEGRAM_OUTBOX_KEEP_DAYS", "7"))
+POLL_SECONDS = 1.0
+DISPATCH_BATCH = 500
+PRUNE_SECONDS = 3600
+# Tempo que uma mensagem fica reservada para quem a pegou; se o processo morrer no meio ela volta a fila
+CLAIM_SECONDS = 120
+
+
+def queue_message(token: str, chat_id: str, text: str) -> bool:
+    # O worker so grava na fila; quem fala com o Telegram e o OUTBOX
+    return queue_messages([(token, chat_id)], text) == 1
+
+
+def queue_messages(targets, text: str) -> int:
+    # Mesma mensagem para varios (token, chat_id) num commit so; o resultado por destinatario fica na linha
+    rows = [TelegramOutbox(token=token, chat_id=str(chat_id), text=text) for token, chat_id in targets if token and chat_id]
+    if rows:
+        db.session.add_all(rows)
+        db.session.commit()
+        OUTBOX.wake()
+    return len(rows)
+
+
+def retry_delay(attempts: int) -> float:
+    return min(RETRY_MAX, RETRY_BASE * 2 ** max(0, attempts - 1))
+
+
+def is_permanent(status) -> bool:
+    # 400/401/403 (chat inexistente, bot bloqueado, token invalido) nao melhoram com nova tentativa; 429 sim
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class OutboxDispatcher:
+    # Uma thread le as mensagens pendentes e distribui por token: cada bot fica sempre na mesma thread,
+    # entao a sessao keep-alive do bot e o ritmo por chat/bot nunca sao disputados entre threads.
+    # Um chat tem no maximo uma mensagem em voo, o que mantem a ordem mesmo com reenvio.
+    def __init__(self, workers=None, session_factory=make_session):
+        self.workers = max(1, workers or DISPATCH_THREADS)
+        self._session_factory = session_factory
+        self._queues = []
+        self._sessions = {}
+        self._next_slot = {}
+        self._in_flight = set()
+        self._busy_chats = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pruned_at = 0.0
+        self.backlog = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latencies = deque(maxlen=500)
+
+    def start(self, app) -> None:
+        if self._queues:
+            return
+        self._queues = [queue.Queue() for _ in range(self.workers)]
+        for index, pending in enumerate(self._queues):
+            threading.Thread(target=self._work, args=(app, pending), name=f"telegram-{index}", daemon=True).start()
+        threading.Thread(target=self._poll, args=(app,), name="telegram-outbox", daemon=True).start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _poll(self, app) -> None:
+        with app.app_context():
+            while True:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                try:
+                    self.dispatch_due()
+                    self.prune()
+                except Exception as exc:
+                    db.session.rollback()
+                    print(f"[telegram] erro no outbox: {exc}")
+                finally:
+                    db.session.remove()
+
+    def dispatch_due(self) -> None:
+        now = now_sp()
+        pending = TelegramOutbox.query.filter_by(status="pending")
+        self.backlog = pending.with_entities(func.count(TelegramOutbox.id)).scalar() or 0
+        held = set()
+        claimed = []
+        for row in pending.order_by(TelegramOutbox.id).limit(DISPATCH_BATCH).all():
+            chat = (row.token, row.chat_id)
+            # So a mensagem mais antiga de cada chat pode sair
+            if chat in held:
+                continue
+            held.add(chat)
+            if row.next_attempt_at > now:
+                continue
+            with self._lock:
+                if chat in self._busy_chats:
+                    continue
+                self._busy_chats.add(chat)
+            # Com varios processos de worker cada um tem seu OUTBOX: so envia quem conseguir reservar a linha
+            reserved = TelegramOutbox.query.filter(
+                TelegramOutbox.id == row.id,
+                TelegramOutbox.status == "pending",
+                TelegramOutbox.next_attempt_at <= now,
+            ).update({"next_attempt_at": now + timedelta(seconds=CLAIM_SECONDS)}, synchronize_session=False)
+            if not reserved:
+                with self._lock:
+                    self._busy_chats.discard(chat)
+                continue
+            db.session.expunge(row)
+            claimed.append(row)
+        try:
+            db.session.commit()
+        except Exception:
+            with self._lock:
+                self._busy_chats.difference_update((row.token, row.chat_id) for row in claimed)
+            raise
+        for row in claimed:
+            with self._lock:
+                self._in_flight.add(row.id)
+            self._queues[hash(row.token) % len(self._queues)].put(row)
+
+    def prune(self) -> None:
+        if time.monotonic() - self._pruned_at < PRUNE_SECONDS:
+            return
+        self._pruned_at = time.monotonic()
+        cutoff = now_sp() - timedelta(days=OUTBOX_KEEP_DAYS)
+        TelegramOutbox.query.filter(
+            TelegramOutbox.status != "pending", TelegramOutbox.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    def _work(self, app, pending) -> None:
+        with app.app_context():
+            while True:
+                row = pending.get()
+                try:
+                    self.deliver(row)
+                except Exception as exc:
+                    db.session.rollback()
+                    print(f"[telegram] erro ao enviar {row.id}: {exc}")
+                finally:
+                    db.session.remove()
+                    with self._lock:
+                        self._in_flight.discard(row.id)
+                        self._busy_chats.discard((row.token, row.chat_id))
+                    self.wake()
+
+    def _session(self, token: str):
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                session = self._sessions[token] = self._session_factory()
+            return session
+
+    def _pace(self, key, interval: float) -> None:
+        if interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(key, now))
+            self._next_slot[key] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def deliver(self, row) -> None:
+        self._pace(("chat", row.token, row.chat_id), CHAT_INTERVAL)
+        self._pace(("bot", row.token), 1 / BOT_RATE if BOT_RATE > 0 else 0)
+        status, detail = post_message(self._session(row.token), row.token, row.chat_id, row.text)
+        attempts = row.attempts + 1
+        values = {"attempts": attempts, "last_error": None if status == 200 else detail[:255]}
+        if status == 200:
+            sent_at = now_sp()
+            latency = int((sent_at - row.created_at).total_seconds() * 1000)
+            values.update(status="sent", sent_at=sent_at, latency_ms=latency)
+            with self._lock:
+                self.sent += 1
+                self.latencies.append(latency)
+        elif is_permanent(status) or attempts >= MAX_ATTEMPTS:
+            values["status"] = "failed"
+            with self._lock:
+                self.failed += 1
+            print(f"[telegram] mensagem {row.id} descartada: {detail}")
+        else:
+            values["next_attempt_at"] = now_sp() + timedelta(seconds=retry_delay(attempts))
+            with self._lock:
+                self.retried += 1
+        TelegramOutbox.query.filter_by(id=row.id).update(values)
+        db.session.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                "workers": self.workers if self._queues else 0,
+                "backlog": self.backlog,
+                "in_flight": len(self._in_flight),
+                "bots": len(self._sessions),
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "latency_p50_ms": latencies[len(latencies) // 2] if latencies else None,
+                "latency_p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            }
+
+
+OUTBOX = OutboxDispatcher()
@@ -0,0 +1,119 @@
+import os
+import queue
+import threading
+import time
+from itertools import count
+
+from app.extensions import db
+
+QUEUE_SIZE = int(os.environ.get("WORKER_QUEUE_SIZE", "64"))
+PARSE_THREADS = int(os.environ.get("WORKER_PARSE_THREADS", "2"))
+NOTIFY_THREADS = int(os.environ.get("WORKER_NOTIFY_THREADS", "4"))
+
+
+class Stage:
+    # Etapa do worker: fila limitada por thread e handler proprio. put() bloqueia com a fila cheia,
+    # entao uma etapa atrasada segura quem alimenta ela (back-pressure) em vez de acumular memoria.
+    # Sem start() o handler roda na hora, na thread de quem chamou (bench, scripts).
+    def __init__(self, name: str, handler, workers: int = 1, maxsize: int | None = None, batch: int = 1):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.maxsize = QUEUE_SIZE if maxsize is None else maxsize
+        # batch > 1: o handler recebe uma lista com o que ja estiver na fila (ate batch itens)
+        self.batch = max(1, batch)
+        self._queues = []
+        self._turn = count()
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.peak = 0
+        self.blocked = 0.0
+        self.waited = 0.0
+        self.busy = 0.0
+        self.slowest = 0.0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._queues)
+
+    def start(self, app) -> None:
+        if self._queues:
+            return
+        self._queues = [queue.Queue(self.maxsize) for _ in range(self.workers)]
+        for index, pending in enumerate(self._queues):
+            threading.Thread(
+                target=self._loop, args=(app, pending), name=f"{self.name}-{index}", daemon=True
+            ).start()
+
+    def put(self, item, key=None) -> None:
+        if not self._queues:
+            self._run([(time.monotonic(), item)])
+            return
+        # Mesma chave, mesma thread: mensagens de um jogo saem na ordem em que foram geradas
+        index = hash(key) if key is not None else next(self._turn)
+        pending = self._queues[index % len(self._queues)]
+        started = time.monotonic()
+        pending.put((started, item))
+        blocked = time.monotonic() - started
+        with self._lock:
+            self.blocked += blocked
+            self.peak = max(self.peak, self.depth())
+
+    def depth(self) -> int:
+        return sum(pending.qsize() for pending in self._queues)
+
+    def join(self) -> None:
+        for pending in self._queues:
+            pending.join()
+
+    def _loop(self, app, pending) -> None:
+        with app.app_context():
+            while True:
+                entries = [pending.get()]
+                while len(entries) < self.batch:
+                    try:
+                        entries.append(pending.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._run(entries)
+                finally:
+                    # Cada item fecha a propria transacao: threads longas nao seguram leitura antiga do SQLite
+                    db.session.remove()
+                    for _ in entries:
+                        pending.task_done()
+
+    def _run(self, entries) -> None:
+        started = time.monotonic()
+        try:
+            if self.batch > 1:
+                self.handler([item for _, item in entries])
+            else:
+                self.handler(entries[0][1])
+        except Exception as exc:
+            db.session.rollback()
+            with self._lock:
+                self.errors += 1
+            print(f"[{self.name}] erro: {exc}")
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.processed += len(entries)
+            self.waited += sum(started - queued_at for queued_at, _ in entries)
+            self.busy += elapsed
+            self.slowest = max(self.slowest, elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            processed = self.processed
+            return {
+                "workers": self.workers if self._queues else 0,
+                "depth": self.depth(),
+                "peak": self.peak,
+                "processed": processed,
+                "errors": self.errors,
+                "blocked_s": round(self.blocked, 3),
+                "wait_ms": round(self.waited / processed * 1000, 1) if processed else 0,
+                "latency_ms": round(self.busy / processed * 1000, 1) if processed else 0,
+                "max_ms": round(self.slowest * 1000, 1),
+            }
@@ -0,0 +1,114 @@
+import os
+import threading
+from bisect import bisect_left, bisect_right
+
+# Abaixo disso o loop escalar e mais rapido que consultar o indice e confirmar os candidatos
+INDEX_MIN_RULES = int(os.environ.get("WORKER_INDEX_MIN_RULES", "1000"))
+LOWER_BOUNDS = (">=", ">", "==")
+
+
+def anchor_condition(conds):
+    # Limite inferior de contador falha cedo no jogo; limite de Minute e "<" ficam por ultimo
+    return min(conds, key=lambda cond: (cond.operator not in LOWER_BOUNDS, cond.stat_key == "Minute"))
+
+
+def holding_range(op: str, thresholds, value, slack=0):
+    # Fatia de limiares (ordenados) para os quais "value <op> limiar" vale; slack aceita limites
+    # inferiores que faltam ate slack pontos (contadores so crescem, limite superior nao tem folga)
+    if op == ">=":
+        return 0, bisect_right(thresholds, value + slack)
+    if op == ">":
+        return 0, bisect_left(thresholds, value + slack)
+    if op == "<=":
+        return bisect_left(thresholds, value), len(thresholds)
+    if op == "<":
+        return bisect_right(thresholds, value), len(thresholds)
+    if op == "==":
+        return bisect_left(thresholds, value), bisect_right(thresholds, value + slack)
+    return 0, 0
+
+
+class ThresholdIndex:
+    # Uma condicao "ancora" por grupo, em baldes (2o tempo?, chave, lado, operador) ordenados por limiar.
+    # Um grupo so pode valer se a ancora vale, entao so as regras com ancora valendo sao avaliadas.
+    def __init__(self):
+        self._buckets = {}
+        self._indexed = {}
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.lookups = 0
+        self.candidates = 0
+
+    def sync(self, rules, compiled) -> None:
+        current = {rule.id: (rule_compiled, bool(rule.second_half_only)) for rule, rule_compiled in zip(rules, compiled)}
+        with self._lock:
+            for rule_id, (rule_compiled, second_half, _) in list(self._indexed.items()):
+                entry = current.get(rule_id)
+                if entry is None or entry[0] is not rule_compiled or entry[1] != second_half:
+                    self._remove(rule_id)
+            for rule_id, (rule_compiled, second_half) in current.items():
+                if rule_id not in self._indexed:
+                    self._add(rule_id, rule_compiled, second_half)
+
+    def _add(self, rule_id, rule_compiled, second_half: bool) -> None:
+        placed = []
+        for conds in rule_compiled.groups:
+            cond = anchor_condition(conds)
+            bucket_key = (second_half, cond.stat_key, cond.side, cond.operator)
+            thresholds, rule_ids = self._buckets.setdefault(bucket_key, ([], []))
+            position = bisect_right(thresholds, cond.value)
+            thresholds.insert(position, cond.value)
+            rule_ids.insert(position, rule_id)
+            placed.append((bucket_key, cond.value))
+        self._indexed[rule_id] = (rule_compiled, second_half, placed)
+        self.updates += 1
+
+    def _remove(self, rule_id) -> None:
+        _, _, placed = self._indexed.pop(rule_id)
+        for bucket_key, value in placed:
+            thresholds, rule_ids = self._buckets[bucket_key]
+            start, end = bisect_left(thresholds, value), bisect_right(thresholds, value)
+            position = start + rule_ids[start:end].index(rule_id)
+            del thresholds[position]
+            del rule_ids[position]
+            if not thresholds:
+                del self._buckets[bucket_key]
+        self.updates += 1
+
+    def candidates_for(self, stats, second_half_stats, slack=0) -> set:
+        found = set()
+        with self._lock:
+            for (second_half, key, side, op), (thresholds, rule_ids) in self._buckets.items():
+                view = second_half_stats if second_half else stats
+                if not view:
+                    continue
+                value = view.get(key, {}).get(side)
+                if value is None:
+                    continue
+                start, end = holding_range(op, thresholds, value, slack)
+                found.update(rule_ids[start:end])
+            self.lookups += 1
+            self.candidates += len(found)
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._indexed.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rules": len(self._indexed),
+                "buckets": len(self._buckets),
+                "updates": self.updates,
+                "lookups": self.lookups,
+                "candidates": self.candidates,
+            }
+
+
+def index_pays_off(rule_count: int) -> bool:
+    return rule_count >= INDEX_MIN_RULES
+
+
+RULE_INDEX = ThresholdIndex()
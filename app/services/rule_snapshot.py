@@ -0,0 +1,68 @@
+import threading
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.extensions import db
+from app.models import ChangeCounter, Rule
+
+RULES_COUNTER = "rules"
+
+
+def bump_rules_version() -> None:
+    # Chamado pelas rotas antes do commit, na mesma transacao da alteracao
+    ChangeCounter.query.filter_by(name=RULES_COUNTER).update({ChangeCounter.value: ChangeCounter.value + 1})
+
+
+def rules_version() -> int:
+    return db.session.query(ChangeCounter.value).filter_by(name=RULES_COUNTER).scalar() or 0
+
+
+class RuleSnapshot:
+    # Regras ativas com condicoes e usuario ja carregados e fora da sessao: commits do worker
+    # nao expiram nada e nenhum atributo dispara lazy-load. So recarrega quando o contador muda.
+    def __init__(self):
+        self.version = None
+        self.rules = []
+        self._by_id = {}
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def current(self):
+        version = rules_version()
+        with self._lock:
+            if version == self.version:
+                return self.rules
+        rules = (
+            Rule.query.options(
+                selectinload(Rule.conditions),
+                selectinload(Rule.outcome_conditions),
+                joinedload(Rule.user),
+            )
+            .filter_by(is_active=True)
+            .all()
+        )
+        for rule in rules:
+            if rule.user is not None and rule.user in db.session:
+                db.session.expunge(rule.user)
+            db.session.expunge(rule)
+        with self._lock:
+            self.version = version
+            self.rules = rules
+            self._by_id = {rule.id: rule for rule in rules}
+            self.refreshes += 1
+        return rules
+
+    def get(self, rule_id):
+        with self._lock:
+            return self._by_id.get(rule_id)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"version": self.version, "rules": len(self.rules), "refreshes": self.refreshes}
+
+
+RULE_SNAPSHOT = RuleSnapshot()
@@ -0,0 +1,43 @@
+import os
+import threading
+import time
+
+POLL_HOT = int(os.environ.get("WORKER_INTERVAL", "15"))
+POLL_WARM = int(os.environ.get("WORKER_POLL_WARM", "30"))
+POLL_COLD = int(os.environ.get("WORKER_POLL_COLD", "60"))
+POLL_HALFTIME = int(os.environ.get("WORKER_POLL_HALFTIME", "60"))
+
+
+class PollScheduler:
+    def __init__(self):
+        self._next = {}
+        self._lock = threading.Lock()
+        self.polled = 0
+        self.deferred = 0
+
+    def due(self, games, now=None):
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            for game in games:
+                if self._next.get(game["game_id"], 0) <= now:
+                    ready.append(game)
+            self.polled = len(ready)
+            self.deferred = len(games) - len(ready)
+        return ready
+
+    def schedule(self, game_id, interval: float, now=None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Meio segundo de folga para o jogo cair no ciclo certo
+            self._next[game_id] = now + max(0, interval - 0.5)
+
+    def forget_missing(self, live_ids) -> None:
+        with self._lock:
+            for game_id in list(self._next):
+                if game_id not in live_ids:
+                    self._next.pop(game_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tracked": len(self._next), "polled": self.polled, "deferred": self.deferred}
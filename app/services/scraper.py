@@ -1,35 +1,67 @@
-﻿import os
+﻿import hashlib
+import importlib.util
+import os
 import re
+import threading
+import time
 import unicodedata
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple
 from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-BASE_URLS = ("https://betsapi.com", "https://pt.betsapi.com")
+from .budget import BudgetExhausted, budgeted_get
+from .mirrors import MIRRORS
+
+# lxml e opcional: o parser rapido usa ele quando estiver instalado
+FAST_PARSER_FEATURES = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+BASE_URLS = tuple(
+    base.strip().rstrip("/")
+    for base in os.environ.get("BETSAPI_BASE_URLS", "https://betsapi.com,https://pt.betsapi.com").split(",")
+    if base.strip()
+)
+RECORD_DIR = os.environ.get("SCRAPER_RECORD_DIR", "")
 SECOND_HALF_TOKENS = ("2nd", "2o", "2h", "2Âº", "2º", "second", "segundo")
+PARSER_BACKEND = os.environ.get("SCRAPER_PARSER", "fast")
+HEDGE_PRIORITIES = ("follow", "new")
+HEDGE_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("BETSAPI_HEDGE_WORKERS", "16")), thread_name_prefix="hedge"
+)
+HEDGE_SESSIONS = threading.local()
+PAGE_CACHE_MAX = int(os.environ.get("SCRAPER_PAGE_CACHE_MAX", "2000"))
+PAGE_CACHE = OrderedDict()
+PAGE_CACHE_LOCK = threading.Lock()
+PARSE_STATS = {"parsed": 0, "not_modified": 0, "unchanged": 0}
+_RACE_TIME_RE = re.compile(r"<span[^>]*race-time[^>]*>.*?</span>", re.S | re.I)
+_BREADCRUMB_RE = re.compile(r"<ol[^>]*breadcrumb[^>]*>.*?</ol>", re.S | re.I)
+_HEADING_RE = re.compile(r"<(title|h1)\b[^>]*>.*?</\1>", re.S | re.I)
 
 
 def make_session():
     session = requests.Session()
     try:
+        # 403/429 nao entram aqui: quem trata e o orcamento (cooldown por host)
         retries = Retry(
-            total=5,
-            connect=5,
-            read=5,
-            backoff_factor=1.5,
-            status_forcelist=(403, 429, 500, 502, 503, 504),
+            total=2,
+            connect=2,
+            read=2,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
             allowed_methods=("GET", "POST"),
         )
     except TypeError:
         retries = Retry(
-            total=5,
-            connect=5,
-            read=5,
-            backoff_factor=1.5,
-            status_forcelist=(403, 429, 500, 502, 503, 504),
+            total=2,
+            connect=2,
+            read=2,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
             method_whitelist=("GET", "POST"),
         )
     adapter = HTTPAdapter(max_retries=retries, pool_connections=20, pool_maxsize=20)
@@ -49,26 +81,150 @@ def make_session():
 
 
 def _swap_base(url: str) -> str:
-    if "://pt.betsapi.com" in url:
-        return url.replace("://pt.betsapi.com", "://betsapi.com", 1)
-    if "://betsapi.com" in url:
-        return url.replace("://betsapi.com", "://pt.betsapi.com", 1)
+    if len(BASE_URLS) < 2:
+        return url
+    for index, base in enumerate(BASE_URLS):
+        if url == base or url.startswith(base + "/"):
+            return BASE_URLS[(index + 1) % len(BASE_URLS)] + url[len(base):]
     return url
 
 
-def get_with_fallback(session, url):
-    resp = session.get(url, timeout=15)
-    if resp.status_code == 403:
-        session.headers.update({"Referer": "https://betsapi.com", "Cache-Control": "no-cache"})
-        resp = session.get(url, timeout=15)
-    if resp.status_code == 403:
-        alt_url = _swap_base(url)
-        if alt_url != url:
-            session.headers.update({"Referer": alt_url.split("/r/")[0]})
-            resp = session.get(alt_url, timeout=15)
+def _record_response(kind: str, url: str, text: str) -> None:
+    # Modo gravacao: guarda o HTML cru para o servidor de replay (bench/replay_server.py)
+    if not RECORD_DIR:
+        return
+    match_id = re.search(r"/rh?/(\d+)", url)
+    folder = os.path.join(RECORD_DIR, kind, match_id.group(1) if match_id else "")
+    try:
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{time.time_ns()}.html"), "w", encoding="utf-8") as handle:
+            handle.write(text)
+    except OSError as exc:
+        print(f"[record] falha ao gravar {url}: {exc}")
+
+
+def _timed_get(session, url, headers, priority, budget_wait=None):
+    started = time.monotonic()
+    try:
+        resp = budgeted_get(session, url, headers=headers, priority=priority, budget_wait=budget_wait)
+    except BudgetExhausted:
+        raise
+    except requests.RequestException:
+        MIRRORS.record(url, time.monotonic() - started, False)
+        raise
+    # elapsed mede so a resposta HTTP, sem a espera por token do orcamento
+    elapsed = getattr(resp, "elapsed", None)
+    latency = elapsed.total_seconds() if elapsed is not None else time.monotonic() - started
+    MIRRORS.record(url, latency, resp.status_code < 400)
     return resp
 
 
+def _is_blocked(resp) -> bool:
+    return resp is None or resp.status_code in (403, 429)
+
+
+def _mirror_headers(url: str, headers):
+    mirror_headers = dict(headers or {})
+    mirror_headers.update({"Referer": url.split("/r/")[0], "Cache-Control": "no-cache"})
+    return mirror_headers
+
+
+def _fallback_get(session, resp, backup, priority):
+    if not _is_blocked(resp):
+        return resp
+    # Espelho bloqueado entrou em cooldown no orcamento: vai direto para o outro
+    try:
+        return _timed_get(session, backup[0], backup[1], priority)
+    except requests.RequestException:
+        if resp is None:
+            raise
+        return resp
+
+
+def _sequential_get(session, primary, backup, priority):
+    resp = None
+    try:
+        resp = _timed_get(session, primary[0], primary[1], priority)
+    except requests.RequestException:
+        pass
+    return _fallback_get(session, resp, backup, priority)
+
+
+def _pooled_get(url, headers, priority, budget_wait=None):
+    # Roda numa thread do HEDGE_POOL com a sessao dela: a requisicao que perde a corrida continua
+    # sozinha, sem dividir a sessao com o chamador, que ja segue para a proxima
+    session = getattr(HEDGE_SESSIONS, "session", None)
+    if session is None:
+        session = HEDGE_SESSIONS.session = make_session()
+    return _timed_get(session, url, headers, priority, budget_wait)
+
+
+def _close_response(future) -> None:
+    try:
+        resp = future.result()
+    except Exception:
+        return
+    if resp is not None:
+        resp.close()
+
+
+def _discard(future) -> None:
+    # Perdedor da corrida: cancela se nem comecou, senao libera a conexao quando terminar
+    if not future.cancel():
+        future.add_done_callback(_close_response)
+
+
+def _hedged_get(session, primary, backup, priority, delay: float):
+    first = HEDGE_POOL.submit(_pooled_get, primary[0], primary[1], priority)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        resp = None
+        try:
+            resp = first.result()
+        except requests.RequestException:
+            pass
+        return _fallback_get(session, resp, backup, priority)
+    # O principal passou do percentil de latencia: dispara o espelho so se houver token agora
+    second = HEDGE_POOL.submit(_pooled_get, backup[0], backup[1], priority, 0)
+    pending = {first, second}
+    fallback = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                resp = future.result()
+            except requests.RequestException:
+                continue
+            if not _is_blocked(resp):
+                MIRRORS.record_hedge(future is second)
+                for other in pending:
+                    _discard(other)
+                if fallback is not None:
+                    fallback.close()
+                return resp
+            if fallback is None:
+                fallback = resp
+    MIRRORS.record_hedge(False)
+    if fallback is not None:
+        return fallback
+    return first.result()
+
+
+def get_with_fallback(session, url, headers=None, priority="new", hedge=None):
+    alt_url = _swap_base(url)
+    if alt_url == url:
+        return _timed_get(session, url, headers, priority)
+    primary_url, backup_url = MIRRORS.order([url, alt_url])
+    primary = (primary_url, headers if primary_url == url else _mirror_headers(primary_url, headers))
+    backup = (backup_url, headers if backup_url == url else _mirror_headers(backup_url, headers))
+    if hedge is None:
+        hedge = priority in HEDGE_PRIORITIES
+    delay = MIRRORS.hedge_delay(primary_url) if hedge else None
+    if delay is None:
+        return _sequential_get(session, primary, backup, priority)
+    return _hedged_get(session, primary, backup, priority, delay)
+
+
 def extrair_valor_td(td):
     span = td.find("span", class_="sr-only")
     return span.get_text(strip=True) if span else td.get_text(strip=True)
@@ -257,21 +413,58 @@ def is_first_half_extra_time(time_text: str) -> bool:
     return base_minute <= 45
 
 
+def _has_class(attrs, name: str) -> bool:
+    value = attrs.get("class") if attrs else None
+    if isinstance(value, str):
+        value = value.split()
+    return bool(value) and name in value
+
+
+def _match_page_region(name, attrs=None) -> bool:
+    if name in ("table", "ol", "h1", "title"):
+        return True
+    return name == "span" and _has_class(attrs, "race-time")
+
+
+LISTING_STRAINER = SoupStrainer("tr", id=re.compile(r"^r_"))
+MATCH_STRAINER = SoupStrainer(_match_page_region)
+
+
+def _reference_soup(html: str, strainer):
+    return BeautifulSoup(html, "html.parser")
+
+
+def _fast_soup(html: str, strainer):
+    # Monta a arvore so com as regioes usadas (linhas da lista, tabelas, breadcrumb, race-time)
+    return BeautifulSoup(html, FAST_PARSER_FEATURES, parse_only=strainer)
+
+
+PARSER_BACKENDS = {"reference": _reference_soup, "fast": _fast_soup}
+
+
+def make_soup(html: str, strainer, backend=None):
+    builder = PARSER_BACKENDS.get(backend or PARSER_BACKEND, _reference_soup)
+    return builder(html, strainer)
+
+
 def fetch_live_games(session):
     last_status = None
-    for base in BASE_URLS:
+    for base in MIRRORS.order(BASE_URLS):
         try:
-            resp = get_with_fallback(session, base)
+            resp = get_with_fallback(session, base, priority="listing")
         except requests.RequestException:
             last_status = None
             continue
         last_status = resp.status_code
         if resp.status_code != 200:
             continue
-        soup = BeautifulSoup(resp.text, "html.parser")
-        break
-    else:
-        return [], last_status
+        _record_response("listing", base, resp.text)
+        return parse_live_games(resp.text, base), resp.status_code
+    return [], last_status
+
+
+def parse_live_games(html: str, base: str, backend=None):
+    soup = make_soup(html, LISTING_STRAINER, backend)
     trs = soup.find_all("tr", id=lambda x: x and x.startswith("r_"))
     games = []
     for tr in trs:
@@ -308,14 +501,99 @@ def fetch_live_games(session):
                 "league": league_name,
             }
         )
-    return games, resp.status_code
+    return games
+
 
+def get_parse_stats() -> dict:
+    with PAGE_CACHE_LOCK:
+        return dict(PARSE_STATS, cached_pages=len(PAGE_CACHE))
 
-def fetch_match_stats(session, url):
-    resp = get_with_fallback(session, url)
+
+def _stats_region_digest(html: str) -> str:
+    # So a regiao que o parser usa: titulo, breadcrumb, race-time e o bloco das tabelas
+    digest = hashlib.blake2b(digest_size=16)
+    for pattern in (_HEADING_RE, _BREADCRUMB_RE, _RACE_TIME_RE):
+        for match in pattern.finditer(html):
+            digest.update(match.group(0).encode("utf-8", "ignore"))
+    start = html.find("<table")
+    end = html.rfind("</table>")
+    if start != -1 and end > start:
+        digest.update(html[start:end].encode("utf-8", "ignore"))
+    return digest.hexdigest()
+
+
+def _copy_payload(payload: dict) -> dict:
+    copied = dict(payload)
+    copied["stats"] = {key: value.copy() for key, value in payload.get("stats", {}).items()}
+    copied["raw_stats"] = dict(payload.get("raw_stats", {}))
+    return copied
+
+
+def _remember_page(url: str, resp, digest: str, payload: dict) -> None:
+    with PAGE_CACHE_LOCK:
+        PAGE_CACHE[url] = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "digest": digest,
+            "payload": payload,
+        }
+        PAGE_CACHE.move_to_end(url)
+        while len(PAGE_CACHE) > PAGE_CACHE_MAX:
+            PAGE_CACHE.popitem(last=False)
+
+
+class RawPage(NamedTuple):
+    url: str
+    resp: object
+    digest: str
+
+
+def download_match_page(session, url, priority="new"):
+    # Payload pronto (304 ou regiao igual a ultima), RawPage quando precisa do parser, None se falhou
+    with PAGE_CACHE_LOCK:
+        cached = PAGE_CACHE.get(url)
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        resp = get_with_fallback(session, url, headers=headers or None, priority=priority)
+    except BudgetExhausted:
+        return None
+    if resp.status_code == 304 and cached:
+        with PAGE_CACHE_LOCK:
+            PARSE_STATS["not_modified"] += 1
+        return _copy_payload(cached["payload"])
     if resp.status_code != 200:
         return None
-    soup = BeautifulSoup(resp.text, "html.parser")
+    _record_response("r", url, resp.text)
+    digest = _stats_region_digest(resp.text)
+    if cached and cached["digest"] == digest:
+        _remember_page(url, resp, digest, cached["payload"])
+        with PAGE_CACHE_LOCK:
+            PARSE_STATS["unchanged"] += 1
+        return _copy_payload(cached["payload"])
+    return RawPage(url, resp, digest)
+
+
+def parse_match_page(page: RawPage):
+    payload = parse_match_stats(page.resp.text, page.url)
+    with PAGE_CACHE_LOCK:
+        PARSE_STATS["parsed"] += 1
+    if payload:
+        _remember_page(page.url, page.resp, page.digest, payload)
+        return _copy_payload(payload)
+    return payload
+
+
+def fetch_match_stats(session, url, priority="new"):
+    page = download_match_page(session, url, priority)
+    return parse_match_page(page) if isinstance(page, RawPage) else page
+
+
+def parse_match_stats(html: str, url: str, backend=None):
+    soup = make_soup(html, MATCH_STRAINER, backend)
 
     league_tag = soup.select_one("ol.breadcrumb li:nth-of-type(2) a")
     league = league_tag.text.strip() if league_tag else ""
@@ -491,13 +769,14 @@ def _parse_history_table(table):
     return items
 
 
-def fetch_match_history(session, match_url: str, limits=None):
+def fetch_match_history(session, match_url: str, limits=None, priority="follow"):
     history_url = history_url_from_match(match_url)
     if not history_url:
         return {"h2h": [], "home": [], "away": []}
-    resp = get_with_fallback(session, history_url)
+    resp = get_with_fallback(session, history_url, priority=priority)
     if resp.status_code != 200:
         return {"h2h": [], "home": [], "away": []}
+    _record_response("rh", history_url, resp.text)
     soup = BeautifulSoup(resp.text, "html.parser")
     tables = _find_history_tables(soup)
     limits = limits or HISTORY_LIMITS
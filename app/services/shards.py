@@ -0,0 +1,150 @@
+import atexit
+import hashlib
+import os
+import socket
+import threading
+import uuid
+from bisect import bisect_left
+from datetime import timedelta
+
+from app.extensions import db
+from app.models import WorkerLease
+from app.utils.time import now_sp
+
+LEASE_TTL = int(os.environ.get("WORKER_LEASE_TTL", "45"))
+HEARTBEAT_SECONDS = float(os.environ.get("WORKER_HEARTBEAT", "10"))
+VIRTUAL_NODES = 64
+
+
+def ring_hash(key: str) -> int:
+    # Nao usa hash(): muda a cada processo (PYTHONHASHSEED) e todos precisam concordar
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    # Hash consistente com nos virtuais: quando um processo entra ou sai, so os jogos dele mudam de dono
+    def __init__(self, members=()):
+        self.members = tuple(sorted(members))
+        points = sorted(
+            (ring_hash(f"{member}#{index}"), member) for member in self.members for index in range(VIRTUAL_NODES)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str):
+        if not self._hashes:
+            return None
+        position = bisect_left(self._hashes, ring_hash(key)) % len(self._hashes)
+        return self._owners[position]
+
+
+class ShardMembership:
+    # Cada processo do worker mantem uma linha em worker_lease com heartbeat; os vivos formam o anel.
+    # Processo que para de bater sai do anel depois de LEASE_TTL e os jogos dele passam para os outros.
+    # Sem start() (um processo so) todo jogo e deste processo.
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.enabled = False
+        self._ring = HashRing()
+        self._lock = threading.Lock()
+        self._app = None
+        self.changes = 0
+        self.owned = 0
+        self.skipped = 0
+
+    def start(self, app) -> None:
+        if self.enabled:
+            return
+        self._app = app
+        # Gerado aqui e nao no import: processos filhos de um fork nao podem herdar o mesmo id
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.enabled = True
+        self.heartbeat()
+        threading.Thread(target=self._beat, name="shard-heartbeat", daemon=True).start()
+        atexit.register(self.release)
+
+    def _beat(self) -> None:
+        stop = threading.Event()
+        with self._app.app_context():
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    self.heartbeat()
+                except Exception as exc:
+                    db.session.rollback()
+                    print(f"[shards] heartbeat falhou: {exc}")
+                finally:
+                    db.session.remove()
+
+    def heartbeat(self) -> None:
+        now = now_sp()
+        updated = WorkerLease.query.filter_by(worker_id=self.worker_id).update({"heartbeat_at": now})
+        if not updated:
+            db.session.add(
+                WorkerLease(worker_id=self.worker_id, pid=os.getpid(), host=socket.gethostname(), started_at=now, heartbeat_at=now)
+            )
+        db.session.commit()
+
+    def refresh(self) -> bool:
+        # Chamado no inicio de cada ciclo; True quando o conjunto de processos vivos mudou
+        if not self.enabled:
+            return False
+        cutoff = now_sp() - timedelta(seconds=LEASE_TTL)
+        members = {worker_id for (worker_id,) in db.session.query(WorkerLease.worker_id).filter(WorkerLease.heartbeat_at >= cutoff)}
+        # O proprio processo sempre conta, mesmo se o heartbeat atrasou
+        members.add(self.worker_id)
+        # Linhas mortas ha muito tempo so ocupam espaco
+        WorkerLease.query.filter(WorkerLease.heartbeat_at < cutoff - timedelta(seconds=LEASE_TTL * 10)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        with self._lock:
+            if set(self._ring.members) == members:
+                return False
+            self._ring = HashRing(members)
+            self.changes += 1
+        print(f"[shards] {len(members)} processo(s) ativos: {', '.join(sorted(members))}")
+        return True
+
+    def owns(self, key) -> bool:
+        if not self.enabled:
+            return True
+        with self._lock:
+            return self._ring.owner(str(key)) == self.worker_id
+
+    def split(self, items, key_of):
+        # Filtra o que e deste processo e guarda quantos ficaram com os outros
+        if not self.enabled:
+            return list(items)
+        mine, others = [], 0
+        for item in items:
+            if self.owns(key_of(item)):
+                mine.append(item)
+            else:
+                others += 1
+        self.owned, self.skipped = len(mine), others
+        return mine
+
+    def release(self) -> None:
+        # Saida limpa: os outros assumem os jogos no proximo ciclo, sem esperar o TTL
+        if not self.enabled or self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                WorkerLease.query.filter_by(worker_id=self.worker_id).delete()
+                db.session.commit()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "worker_id": self.worker_id,
+                "peers": len(self._ring.members),
+                "owned": self.owned,
+                "skipped": self.skipped,
+                "changes": self.changes,
+            }
+
+
+SHARDS = ShardMembership()
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+SNAPSHOT_TTL = float(os.environ.get("WORKER_SNAPSHOT_TTL", "30"))
+
+
+class SnapshotCache:
+    def __init__(self, ttl=None):
+        self.ttl = SNAPSHOT_TTL if ttl is None else ttl
+        self._items = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.total_hits = 0
+        self.total_misses = 0
+
+    def new_cycle(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _lookup(self, game_id):
+        entry = self._items.get(game_id)
+        if not entry:
+            return None
+        stored_at, payload = entry
+        if time.monotonic() - stored_at > self.ttl:
+            self._items.pop(game_id, None)
+            return None
+        return payload
+
+    def get(self, game_id):
+        with self._lock:
+            payload = self._lookup(game_id)
+            if payload is None:
+                self.misses += 1
+                self.total_misses += 1
+            else:
+                self.hits += 1
+                self.total_hits += 1
+            return payload
+
+    def put(self, game_id, payload) -> None:
+        if not game_id or not payload:
+            return
+        with self._lock:
+            self._items[game_id] = (time.monotonic(), payload)
+
+    def peek(self, game_id):
+        with self._lock:
+            return self._lookup(game_id)
+
+    def fetch_many(self, engine, games, priority="new"):
+        # Entrega primeiro o que ja esta no ciclo; o resto chega em ordem de conclusao
+        missing = {}
+        for game in games:
+            game_id = game["game_id"]
+            if game_id in missing:
+                continue
+            payload = self.get(game_id)
+            if payload is None:
+                missing[game_id] = game
+            else:
+                yield game, payload
+        for game, payload in engine.fetch_stats(list(missing.values()), priority):
+            self.put(game["game_id"], payload)
+            yield game, payload
+
+    def prefetch(self, engine, targets, priority="new") -> None:
+        games = [{"game_id": game_id, "url": url} for game_id, url in targets]
+        for _ in self.fetch_many(engine, games, priority):
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "total_hits": self.total_hits,
+                "total_misses": self.total_misses,
+            }
@@ -0,0 +1,71 @@
+import threading
+
+
+def changed_keys(old: dict, new: dict) -> set:
+    # Chaves ja normalizadas pelo parser (normalize_stat_key); chave que sumiu ou apareceu tambem conta
+    if old is new:
+        return set()
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+class ViewDiff:
+    # Uma visao de stats de um jogo neste ciclo, contra a ultima visao avaliada do mesmo jogo
+    def __init__(self, owner, dirty, previous: dict):
+        self._owner = owner
+        self.dirty = dirty
+        self._previous = previous
+        self.failed = {}
+
+    def still_false(self, entry_id, compiled, reads) -> bool:
+        # Falhou na visao anterior com as mesmas condicoes e nada do que le mudou: continua falso
+        if self.dirty is None or self._previous.get(entry_id) is not compiled or not reads.isdisjoint(self.dirty):
+            self._owner.evaluated += 1
+            return False
+        self.failed[entry_id] = compiled
+        self._owner.reused += 1
+        return True
+
+    def record_false(self, entry_id, compiled) -> None:
+        self.failed[entry_id] = compiled
+
+
+class StatsDiff:
+    # Por jogo e visao (jogo todo, 2o tempo, delta de cada alerta): ultimo dict de stats e quem falhou nele.
+    # Resultado falso so e reaproveitado se foi obtido exatamente contra esse dict guardado.
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.reused = 0
+
+    def view(self, key, stats: dict) -> ViewDiff:
+        # key comeca pelo game_id; o dict guardado nunca e alterado no lugar pelo worker
+        with self._lock:
+            previous = self._views.get(key)
+            if previous is None:
+                diff = ViewDiff(self, None, {})
+            else:
+                diff = ViewDiff(self, changed_keys(previous[0], stats), previous[1])
+            self._views[key] = (stats, diff.failed)
+        return diff
+
+    def forget_missing(self, game_ids) -> None:
+        with self._lock:
+            for key in list(self._views):
+                if key[0] not in game_ids:
+                    self._views.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "views": len(self._views),
+                "evaluated": self.evaluated,
+                "reused": self.reused,
+            }
+
+
+STATS_DIFF = StatsDiff()
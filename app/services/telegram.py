@@ -1,13 +1,15 @@
+import os
+
 import requests
 
 from .scraper import make_session
 
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
 
-def send_message(token: str, chat_id: str, text: str):
-    if not token or not chat_id:
-        return False, "Token/chat_id ausente."
-    session = make_session()
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+
+def post_message(session, token: str, chat_id: str, text: str):
+    # (status HTTP ou None se nem chegou na API, detalhe)
+    url = f"{TELEGRAM_API_BASE}/bot{token}/sendMessage"
     payload = {
         "chat_id": chat_id,
         "text": text,
@@ -16,11 +18,18 @@ def send_message(token: str, chat_id: str, text: str):
     }
     try:
         resp = session.post(url, data=payload, timeout=15)
-        if resp.status_code != 200:
-            return False, f"HTTP {resp.status_code}"
-        return True, "ok"
     except requests.RequestException as exc:
-        return False, str(exc)
+        return None, str(exc)
+    if resp.status_code != 200:
+        return resp.status_code, f"HTTP {resp.status_code}"
+    return 200, "ok"
+
+
+def send_message(token: str, chat_id: str, text: str):
+    if not token or not chat_id:
+        return False, "Token/chat_id ausente."
+    status, detail = post_message(make_session(), token, chat_id, text)
+    return status == 200, detail
 
 
 def send_document(token: str, chat_id: str, file_path: str, caption: str | None = None):
@@ -29,7 +38,7 @@ def send_document(token: str, chat_id: str, file_path: str, caption: str | None
     if not file_path:
         return False, "Arquivo nao informado."
     session = make_session()
-    url = f"https://api.telegram.org/bot{token}/sendDocument"
+    url = f"{TELEGRAM_API_BASE}/bot{token}/sendDocument"
     data = {"chat_id": chat_id}
     if caption:
         data["caption"] = caption
@@ -1,36 +1,60 @@
 import json
 import os
 import re
+import socket
 import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import partial
+from typing import NamedTuple
 
 from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db
-from app.models import MatchAlert, Rule, User
-from app.services.evaluator import compare, evaluate_rule, history_confidence, render_message, stats_to_json
+from app.models import MatchAlert, Rule, ScrapeStatus, User
+from app.services.alert_index import ALERT_INDEX
+from app.services.batch_eval import BATCH_EVALUATOR, batch_available
+from app.services.budget import budget_stats
+from app.services.dead_groups import DEAD_GROUPS
+from app.services.evaluator import COMPILED_RULES, evaluate_compiled, evaluate_groups, history_confidence, render_message, stats_to_json
 from app.services.exporter import export_alert
+from app.services.fetcher import MAX_IN_FLIGHT, FetchEngine
+from app.services.game_state import GAME_STATE
+from app.services.mirrors import MIRRORS
+from app.services.outbox import OUTBOX, queue_message, queue_messages
+from app.services.pipeline import NOTIFY_THREADS, PARSE_THREADS, QUEUE_SIZE, Stage
+from app.services.rule_index import RULE_INDEX, index_pays_off
+from app.services.rule_snapshot import RULE_SNAPSHOT
+from app.services.history_cache import HISTORY_CACHE, get_match_history
+from app.services.leader import WORKER_LOCK
+from app.services.scheduler import POLL_COLD, POLL_HALFTIME, POLL_HOT, POLL_WARM, PollScheduler
+from app.services.shards import SHARDS
+from app.services.snapshots import SnapshotCache
+from app.services.stats_diff import STATS_DIFF
 from app.services.scraper import (
+    RawPage,
     fetch_live_games,
-    fetch_match_history,
-    fetch_match_stats,
     format_history_summary,
+    get_parse_stats,
     is_first_half_extra_time,
     make_session,
-    normalize_stat_key,
+    parse_match_page,
     summarize_history,
 )
-from app.services.telegram import send_message
 from app.utils.time import now_sp
 
 POLL_INTERVAL = int(os.environ.get("WORKER_INTERVAL", "15"))
-GAME_DELAY = float(os.environ.get("WORKER_GAME_DELAY", "1.5"))
 EXPORT_DIR = os.environ.get("EXPORT_DIR", "data/exports")
 RULE_CONF_SAMPLE = int(os.environ.get("RULE_CONF_SAMPLE", "50"))
 RULE_CONF_MIN = int(os.environ.get("RULE_CONF_MIN", "10"))
+POLL_SKIP = int(os.environ.get("WORKER_POLL_SKIP", "600"))
+NEAR_MARGIN = int(os.environ.get("WORKER_NEAR_MARGIN", "1"))
+PRUNE_MINUTE_SLACK = int(os.environ.get("WORKER_PRUNE_MINUTE_SLACK", "2"))
+PRUNE_STATS = {"cycle": 0, "total": 0}
 
-API_STATUS = {"ok": None, "code": None, "checked_at": None, "last_cycle": None}
+# Status da API gravado ha mais tempo que isso: o worker parou, o painel mostra OFFLINE
+STATUS_STALE_SECONDS = max(120, POLL_INTERVAL * 4)
+API_STATUS = {"ok": None, "code": None, "checked_at": None, "last_cycle": None, "snapshots": None, "parser": None, "scheduler": None, "pruned": None, "budget": None, "mirrors": None, "rules": None, "batch": None, "index": None, "alerted": None, "snapshot": None, "dead": None, "diff": None, "state": None}
 API_ALERT_STATE = {"last_ok": None}
 SECOND_HALF_BASELINES = {}
 HALFTIME_SEEN_AT = {}
@@ -39,6 +63,11 @@ HALFTIME_CONFIRM_SECONDS = int(os.environ.get("HALFTIME_CONFIRM_SECONDS", "120")
 FORCE_SECOND_HALF_BASELINE_MINUTE = int(os.environ.get("FORCE_SECOND_HALF_BASELINE_MINUTE", "55"))
 PENALTY_ALERTED = set()
 PENALTY_LAST_TOTAL = {}
+# A lista da BetsAPI as vezes pula um jogo por um ciclo: o estado dele so sai depois desse tempo fora
+GAME_STATE_GRACE = int(os.environ.get("GAME_STATE_GRACE", "600"))
+MISSING_SINCE = {}
+LISTING_STATS = {"latency_ms": None}
+NOTIFY_LOCAL = threading.local()
 NON_DELTA_KEYS = {"Minute", "Possession"}
 YOUTH_TOKENS = (
     "u19", "u-19", "u 19", "sub19", "sub-19", "sub 19", "under 19",
@@ -46,19 +75,59 @@ YOUTH_TOKENS = (
 )
 
 def get_api_status() -> dict:
+    # ok/code/horarios vem do banco: so o processo com o worker atualiza API_STATUS, mas qualquer um responde
+    row = db.session.get(ScrapeStatus, "betsapi")
+    fresh = bool(row and row.checked_at and now_sp() - row.checked_at <= timedelta(seconds=STATUS_STALE_SECONDS))
     return {
-        "ok": API_STATUS.get("ok"),
-        "code": API_STATUS.get("code"),
-        "checked_at": API_STATUS.get("checked_at"),
-        "last_cycle": API_STATUS.get("last_cycle"),
+        "ok": row.ok if fresh else None,
+        "code": row.code if row else None,
+        "checked_at": row.checked_at.strftime("%Y-%m-%d %H:%M:%S") if row and row.checked_at else None,
+        "last_cycle": row.last_cycle.strftime("%Y-%m-%d %H:%M:%S") if row and row.last_cycle else None,
+        "snapshots": API_STATUS.get("snapshots"),
+        "parser": API_STATUS.get("parser"),
+        "scheduler": API_STATUS.get("scheduler"),
+        "pruned": API_STATUS.get("pruned"),
+        "budget": API_STATUS.get("budget"),
+        "mirrors": API_STATUS.get("mirrors"),
+        "rules": API_STATUS.get("rules"),
+        "batch": API_STATUS.get("batch"),
+        "index": API_STATUS.get("index"),
+        "alerted": API_STATUS.get("alerted"),
+        "snapshot": API_STATUS.get("snapshot"),
+        "dead": API_STATUS.get("dead"),
+        "diff": API_STATUS.get("diff"),
+        "state": API_STATUS.get("state"),
+        # Profundidade das filas no momento da consulta, nao do fim do ultimo ciclo
+        "pipeline": pipeline_stats(),
+        "outbox": OUTBOX.stats(),
+        "shards": SHARDS.stats(),
+        "leader": WORKER_LOCK.stats(),
     }
 
 def update_api_status(ok: bool, code: int | None):
+    checked_at = now_sp()
     API_STATUS["ok"] = ok
     API_STATUS["code"] = code
-    API_STATUS["checked_at"] = now_sp().strftime("%Y-%m-%d %H:%M:%S")
+    API_STATUS["checked_at"] = checked_at.strftime("%Y-%m-%d %H:%M:%S")
+    save_scrape_status(ok=ok, code=code, checked_at=checked_at)
     notify_api_status(ok, code)
 
+def save_scrape_status(**values) -> None:
+    # Uma linha para todos os processos (com shards vale a consulta mais recente de qualquer um)
+    values["holder"] = f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        if not ScrapeStatus.query.filter_by(name="betsapi").update(values, synchronize_session=False):
+            db.session.add(ScrapeStatus(name="betsapi", **values))
+        db.session.commit()
+    except IntegrityError:
+        # Outro processo criou a linha primeiro
+        db.session.rollback()
+        ScrapeStatus.query.filter_by(name="betsapi").update(values, synchronize_session=False)
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        print(f"[worker] erro ao gravar status da API: {exc}")
+
 def notify_api_status(ok: bool, code: int | None):
     last_ok = API_ALERT_STATE.get("last_ok")
     if last_ok is None:
@@ -66,20 +135,18 @@ def notify_api_status(ok: bool, code: int | None):
         if ok: return
         reason = f"HTTP {code}" if code else "erro de conexao/anti-bot"
         message = f"API OFF: possivel anti-bot ativo ({reason})."
-        for user in User.query.filter_by(telegram_verified=True).all():
-            if user.telegram_token and user.telegram_chat_id:
-                send_message(user.telegram_token, user.telegram_chat_id, message)
+        # Com varios processos todos veem a queda; so o dono da chave avisa
+        if SHARDS.owns("api-status"): queue_messages(verified_chats(), message)
         return
 
     if last_ok == ok: return
     API_ALERT_STATE["last_ok"] = ok
-    users = User.query.filter_by(telegram_verified=True).all()
-    if not users: return
-
     message = "API voltou ao normal (status 200)." if ok else f"API OFF: possivel anti-bot ativo ({'HTTP ' + str(code) if code else 'erro de conexao/anti-bot'})."
-    for user in users:
-        if user.telegram_token and user.telegram_chat_id:
-            send_message(user.telegram_token, user.telegram_chat_id, message)
+    # Um commit para todos os usuarios; o envio em paralelo (e o resultado de cada um) fica com o outbox
+    if SHARDS.owns("api-status"): queue_messages(verified_chats(), message)
+
+def verified_chats():
+    return db.session.query(User.telegram_token, User.telegram_chat_id).filter(User.telegram_verified.is_(True)).all()
 
 def is_half_time(time_text: str, minute: int) -> bool:
     text = (time_text or "").lower()
@@ -175,6 +242,64 @@ def ensure_second_half_baseline(game_id: str, stats_payload) -> None:
         HALFTIME_SEEN_AT.pop(game_id, None)
         HALFTIME_CONFIRMED_AT.pop(game_id, None)
 
+def game_states() -> dict:
+    # Estado por jogo no formato salvo pelo GAME_STATE (datas em ISO, penaltis como listas)
+    states = {}
+    for game_id, baseline in SECOND_HALF_BASELINES.items():
+        states.setdefault(game_id, {})["baseline"] = baseline
+    for game_id, seen_at in HALFTIME_SEEN_AT.items():
+        states.setdefault(game_id, {})["seen_at"] = seen_at.isoformat()
+    for game_id, confirmed_at in HALFTIME_CONFIRMED_AT.items():
+        states.setdefault(game_id, {})["confirmed_at"] = confirmed_at.isoformat()
+    for key in sorted(set(PENALTY_LAST_TOTAL) | PENALTY_ALERTED, key=lambda key: (key[1], key[2] or 0)):
+        states.setdefault(key[0], {}).setdefault("penalties", []).append(
+            [key[1], key[2], PENALTY_LAST_TOTAL.get(key), key in PENALTY_ALERTED]
+        )
+    return states
+
+def forget_game_states(keep) -> int:
+    # Jogo fora da lista e sem alerta aberto ha GAME_STATE_GRACE perde baseline, intervalo e penaltis;
+    # sem isso game_states remontava (e o GAME_STATE comparava) a cada ciclo todo jogo ja visto
+    now = time.monotonic()
+    tracked = set(SECOND_HALF_BASELINES) | set(HALFTIME_SEEN_AT) | set(HALFTIME_CONFIRMED_AT)
+    tracked.update(key[0] for key in PENALTY_LAST_TOTAL)
+    tracked.update(key[0] for key in PENALTY_ALERTED)
+    for game_id in list(MISSING_SINCE):
+        if game_id in keep or game_id not in tracked:
+            del MISSING_SINCE[game_id]
+    dropped = {game_id for game_id in tracked - keep if now - MISSING_SINCE.setdefault(game_id, now) >= GAME_STATE_GRACE}
+    if not dropped:
+        return 0
+    for game_id in dropped:
+        SECOND_HALF_BASELINES.pop(game_id, None)
+        HALFTIME_SEEN_AT.pop(game_id, None)
+        HALFTIME_CONFIRMED_AT.pop(game_id, None)
+        MISSING_SINCE.pop(game_id, None)
+    for key in [key for key in PENALTY_LAST_TOTAL if key[0] in dropped]:
+        del PENALTY_LAST_TOTAL[key]
+    PENALTY_ALERTED.difference_update([key for key in PENALTY_ALERTED if key[0] in dropped])
+    return len(dropped)
+
+def restore_game_states(states: dict) -> int:
+    # Nao sobrescreve o que ja esta em memoria (jogo assumido de outro processo que este ja acompanhava)
+    restored = 0
+    for game_id, state in states.items():
+        if not SHARDS.owns(game_id): continue
+        restored += 1
+        if "baseline" in state:
+            SECOND_HALF_BASELINES.setdefault(game_id, state["baseline"])
+        if "seen_at" in state:
+            HALFTIME_SEEN_AT.setdefault(game_id, datetime.fromisoformat(state["seen_at"]))
+        if "confirmed_at" in state:
+            HALFTIME_CONFIRMED_AT.setdefault(game_id, datetime.fromisoformat(state["confirmed_at"]))
+        for rule_id, alert_id, last_total, alerted in state.get("penalties", ()):
+            key = (game_id, rule_id, alert_id)
+            if last_total is not None:
+                PENALTY_LAST_TOTAL.setdefault(key, last_total)
+            if alerted:
+                PENALTY_ALERTED.add(key)
+    return restored
+
 def apply_second_half_delta(stats, baseline):
     adjusted = {}
     for key, value in stats.items():
@@ -270,126 +395,461 @@ def maybe_notify_penalty(rule, user, game_id, stats, minute, score, url, home_te
     if key in PENALTY_ALERTED:
         return
     PENALTY_ALERTED.add(key)
-    send_message(
-        user.telegram_token,
-        user.telegram_chat_id,
-        f"🟡 Penalti agora!\nRegra: {rule.name}\n{home_team} vs {away_team}\nTempo: {minute}'\nPlacar: {score}\nLink: {url}",
+    NOTIFY.put(
+        partial(
+            queue_message,
+            user.telegram_token,
+            user.telegram_chat_id,
+            f"🟡 Penalti agora!\nRegra: {rule.name}\n{home_team} vs {away_team}\nTempo: {minute}'\nPlacar: {score}\nLink: {url}",
+        ),
+        key=game_id,
     )
 
-def evaluate_outcome_conditions(conditions, stats: dict) -> bool:
-    if not conditions: return False
-    for cond in conditions:
-        key = normalize_stat_key(cond.stat_key)
-        if key not in stats: return False
-        side_values = stats[key]
-        if cond.side not in side_values: return False
-        value = side_values[cond.side]
-        if value is None or not compare(cond.operator, value, cond.value): return False
-    return True
-
 def start_worker(app):
-    threading.Thread(target=run_worker, args=(app,), daemon=True).start()
+    # Cada processo do servidor web chama isto; so quem pegar o lock roda o worker
+    WORKER_LOCK.start(app, run_worker)
 
-def run_worker(app):
+def run_worker(app, sharded: bool = False):
     with app.app_context():
+        if sharded:
+            # Divide os jogos com os outros processos pelo anel de worker_lease (ver app/worker_main.py)
+            SHARDS.start(app)
         session = make_session()
+        try:
+            HISTORY_CACHE.warm()
+        except Exception as exc:
+            print(f"[worker] cache de historico indisponivel: {exc}")
+        ALERT_INDEX.load()
+        try:
+            # Reinicio no meio do jogo: baselines do 2o tempo e penaltis voltam do disco
+            print(f"[worker] estado de {restore_game_states(GAME_STATE.load())} jogo(s) restaurado")
+        except Exception as exc:
+            print(f"[worker] estado dos jogos indisponivel: {exc}")
+        for stage in STAGES:
+            stage.start(app)
+        OUTBOX.start(app)
+        engine = FetchEngine()
+        snapshots = SnapshotCache()
+        scheduler = PollScheduler()
         while True:
+            if not WORKER_LOCK.allows():
+                # Perdeu o lock (heartbeat atrasou e outro processo assumiu): fica parado ate recuperar
+                time.sleep(POLL_INTERVAL)
+                continue
+            snapshots.new_cycle()
             try:
-                process_live_games(session)
-                follow_alerts(session)
-                finalize_full_time(session)
+                if SHARDS.refresh():
+                    # Jogos assumidos de outro processo: recarrega os pares (regra, jogo) ja alertados e o estado salvo
+                    ALERT_INDEX.load()
+                    restore_game_states(GAME_STATE.load())
+                process_live_games(session, engine, snapshots, scheduler)
+                follow_alerts(engine, snapshots)
+                finalize_full_time(engine, snapshots)
             except Exception as exc:
                 db.session.rollback()
                 print(f"[worker] erro: {exc}")
-            API_STATUS["last_cycle"] = now_sp().strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                GAME_STATE.save(game_states())
+            except Exception as exc:
+                print(f"[worker] erro ao salvar estado dos jogos: {exc}")
+            last_cycle = now_sp()
+            API_STATUS["last_cycle"] = last_cycle.strftime("%Y-%m-%d %H:%M:%S")
+            save_scrape_status(last_cycle=last_cycle)
+            API_STATUS["snapshots"] = snapshots.stats()
+            API_STATUS["parser"] = get_parse_stats()
+            API_STATUS["scheduler"] = scheduler.stats()
+            API_STATUS["pruned"] = dict(PRUNE_STATS)
+            API_STATUS["budget"] = budget_stats()
+            API_STATUS["mirrors"] = MIRRORS.stats()
+            API_STATUS["rules"] = COMPILED_RULES.stats()
+            API_STATUS["batch"] = BATCH_EVALUATOR.stats()
+            API_STATUS["index"] = RULE_INDEX.stats()
+            API_STATUS["alerted"] = ALERT_INDEX.stats()
+            API_STATUS["snapshot"] = RULE_SNAPSHOT.stats()
+            API_STATUS["dead"] = DEAD_GROUPS.stats()
+            API_STATUS["diff"] = STATS_DIFF.stats()
+            API_STATUS["state"] = GAME_STATE.stats()
             time.sleep(POLL_INTERVAL)
 
-def process_live_games(session):
+class LiveCycle(NamedTuple):
+    # O que as etapas precisam saber do ciclo que gerou o item
+    engine: object
+    snapshots: object
+    scheduler: object
+    active_rules: list
+    compiled: list
+    positions: dict
+    batch: bool
+    indexed: bool
+    open_games: set
+
+
+def process_live_games(session, engine, snapshots, scheduler):
+    started = time.monotonic()
     games, status_code = fetch_live_games(session)
+    LISTING_STATS["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
     update_api_status(status_code == 200, status_code)
+    games = SHARDS.split(games, lambda game: game["game_id"])
     if not games: return
 
-    active_rules = Rule.query.filter_by(is_active=True).all()
-    for game in games:
-        stats_payload = fetch_match_stats(session, game["url"])
-        if not stats_payload or is_youth_match(stats_payload): continue
-        
+    live_ids = {game["game_id"] for game in games}
+    scheduler.forget_missing(live_ids)
+    ALERT_INDEX.forget_missing(live_ids)
+    DEAD_GROUPS.forget_missing(live_ids)
+    active_rules = RULE_SNAPSHOT.current()
+    COMPILED_RULES.retain({rule.id for rule in active_rules})
+    ALERT_INDEX.sync(active_rules)
+    open_games = {
+        game_id for (game_id,) in db.session.query(MatchAlert.game_id).filter(MatchAlert.ft_completed.is_(False))
+    }
+    STATS_DIFF.forget_missing(live_ids | open_games)
+    forget_game_states(live_ids | open_games)
+    filters = listing_filters(active_rules)
+    candidates = [game for game in games if listing_can_match(filters, game)]
+    PRUNE_STATS["cycle"] = len(games) - len(candidates)
+    PRUNE_STATS["total"] += PRUNE_STATS["cycle"]
+
+    # Com muitas regras a avaliacao vai em lote (o que estiver na fila do evaluate); sem NumPy e com
+    # regras o bastante cada jogo e avaliado so contra as que o indice de limiares nao descartou
+    compiled = [COMPILED_RULES.get(rule) for rule in active_rules]
+    batch = batch_available(len(active_rules))
+    indexed = not batch and index_pays_off(len(active_rules))
+    # O indice tambem responde "alguma regra perto de disparar" no poll_interval, nos dois caminhos
+    RULE_INDEX.sync(active_rules, compiled)
+    positions = {rule.id: index for index, rule in enumerate(active_rules)}
+    cycle = LiveCycle(engine, snapshots, scheduler, active_rules, compiled, positions, batch, indexed, open_games)
+    try:
+        for game in scheduler.due(candidates):
+            FETCH.put((game, cycle))
+    finally:
+        # follow/finalize leem os alertas gravados: espera ate o persist; notify e export seguem em paralelo
+        for stage in (FETCH, PARSE, EVALUATE, PERSIST):
+            stage.join()
+
+def fetch_page(item):
+    game, cycle = item
+    payload = cycle.snapshots.get(game["game_id"])
+    if payload is None:
+        payload = cycle.engine.download(game["url"])
+        if isinstance(payload, RawPage):
+            PARSE.put((game, payload, cycle))
+            return
+        cycle.snapshots.put(game["game_id"], payload)
+    EVALUATE.put((game, payload, cycle))
+
+def parse_page(item):
+    game, page, cycle = item
+    try:
+        payload = parse_match_page(page)
+    except Exception as exc:
+        print(f"[parse] erro em {page.url}: {exc}")
+        payload = None
+    cycle.snapshots.put(game["game_id"], payload)
+    EVALUATE.put((game, payload, cycle))
+
+def evaluate_pages(items):
+    ready = []
+    for game, stats_payload, cycle in items:
+        if not stats_payload:
+            cycle.scheduler.schedule(game["game_id"], POLL_HOT)
+            continue
+        if is_youth_match(stats_payload):
+            cycle.scheduler.schedule(game["game_id"], POLL_SKIP)
+            continue
+
         minute = stats_payload.get("minute")
-        if minute is None: continue
+        if minute is None:
+            cycle.scheduler.schedule(game["game_id"], POLL_HOT)
+            continue
 
         ensure_second_half_baseline(game["game_id"], stats_payload)
-        
-        for rule in active_rules:
-            user = rule.user
-            existing = MatchAlert.query.filter_by(game_id=game["game_id"], rule_id=rule.id).first()
-            if existing: continue
+        # Visao do 2o tempo e placar montados uma vez por jogo: servem a avaliacao e ao poll_interval
+        views = {False: stats_payload["stats"], True: second_half_view(game["game_id"], stats_payload)}
+        score = parse_score(stats_payload.get("score", ""))
+        if cycle.batch:
+            ready.append((game, stats_payload, views, score))
+        elif cycle.indexed:
+            found = RULE_INDEX.candidates_for(views[False], views[True])
+            rules = [cycle.active_rules[cycle.positions[rule_id]] for rule_id in sorted(found, key=cycle.positions.get)]
+            finish_game(cycle, game, stats_payload, rules, views, score)
+        else:
+            finish_game(cycle, game, stats_payload, cycle.active_rules, views, score)
+    if not ready:
+        return
+    rows = [(views[False], views[True], *score) for _, _, views, score in ready]
+    # Os itens de uma fila drenada sao sempre do mesmo ciclo (process_live_games espera o evaluate)
+    cycle = items[0][2]
+    # O lote so filtra: evaluate_game_rules confirma cada par no caminho escalar antes de alertar
+    matches = BATCH_EVALUATOR.matches(cycle.active_rules, cycle.compiled, rows)
+    for (game, stats_payload, views, score), matched in zip(ready, matches):
+        finish_game(cycle, game, stats_payload, matched, views, score)
+
+def finish_game(cycle, game, stats_payload, rules, views, score):
+    evaluate_game_rules(game, stats_payload, rules, views, score)
+    interval = poll_interval(game["game_id"], stats_payload, cycle, views, score, game["game_id"] in cycle.open_games)
+    cycle.scheduler.schedule(game["game_id"], interval)
+
+def listing_filters(active_rules):
+    # Por regra: (second_half_only, [condicoes de Minute de cada grupo])
+    filters = []
+    for rule in active_rules:
+        groups = COMPILED_RULES.get(rule).groups
+        if groups:
+            bounds = [[(cond.operator, cond.value) for cond in conds if cond.stat_key == "Minute"] for conds in groups]
+            filters.append((bool(rule.second_half_only), bounds))
+    return filters
 
-            stats_for_rule = stats_payload["stats"]
-            h_score, a_score = parse_score(stats_payload.get("score", ""))
-            if (rule.score_home is not None and h_score != rule.score_home) or \
-               (rule.score_away is not None and a_score != rule.score_away):
+def minute_may_hold(op: str, value: int, minute: int) -> bool:
+    # A lista pode estar alguns segundos atras da pagina do jogo: da uma folga
+    low, high = minute - PRUNE_MINUTE_SLACK, minute + PRUNE_MINUTE_SLACK
+    if op == ">=": return high >= value
+    if op == ">": return high > value
+    if op == "<=": return low <= value
+    if op == "<": return low < value
+    if op == "==": return low <= value <= high
+    return False
+
+def awaiting_baseline(game_id, minute, time_text) -> bool:
+    # Regra do 2o tempo depende da baseline: do fim do 1o tempo ate ela ser capturada o jogo e sempre buscado,
+    # senao a primeira busca so vem perto do limite de Minute da regra e o comeco do 2o tempo se perde
+    if game_id in SECOND_HALF_BASELINES:
+        return False
+    return is_half_time_text(time_text) or (minute is not None and minute >= 44)
+
+def listing_can_match(filters, game) -> bool:
+    league = (game.get("league") or "").lower()
+    if any(token in league for token in YOUTH_TOKENS):
+        return False
+    minute = game.get("minute")
+    time_text = game.get("time_text", "")
+    for second_half_only, groups in filters:
+        eff_minute = minute
+        if second_half_only:
+            if awaiting_baseline(game["game_id"], minute, time_text):
+                return True
+            if is_first_half_extra_time(time_text) or is_half_time_text(time_text):
+                continue
+            if minute is not None and minute + PRUNE_MINUTE_SLACK < 46:
                 continue
+            eff_minute = max(0, minute - 45) if minute is not None else None
+        if eff_minute is None:
+            return True
+        for bounds in groups:
+            if all(minute_may_hold(op, value, eff_minute) for op, value in bounds):
+                return True
+    return False
 
-            if rule.second_half_only:
-                if is_first_half_extra_time(stats_payload.get("time_text", "")):
-                    continue
-                if minute < 46:
-                    continue
-                baseline = SECOND_HALF_BASELINES.get(game["game_id"])
-                if not baseline: continue
-                stats_for_rule = apply_second_half_delta(stats_payload["stats"], baseline)
-                m2h = max(0, minute - 45)
-                stats_for_rule["Minute"] = {"home": m2h, "away": m2h, "total": m2h}
-
-            if evaluate_rule(rule, stats_for_rule):
-                if not user:
-                    continue
-                if rule.notify_telegram and (not user.telegram_token or not user.telegram_chat_id):
-                    continue
-                
-                alert = MatchAlert(
-                    rule_id=rule.id, user_id=user.id, game_id=game["game_id"], url=game["url"],
-                    status="pending", alert_minute=minute, initial_score=stats_payload["score"],
-                    last_score=stats_payload["score"], last_score_minute=minute,
-                    initial_stats_json=stats_to_json(stats_for_rule),
-                    league=stats_payload.get("league"), home_team=stats_payload.get("home_team"),
-                    away_team=stats_payload.get("away_team")
-                )
-                db.session.add(alert)
-                try:
-                    db.session.commit()
-                    rule.last_alert_at = now_sp()
-                    rule.last_alert_desc = f"{alert.home_team} vs {alert.away_team}"
-                    db.session.commit()
-
-                    if rule.alert_on_penalty:
-                        penalties_total = stats_payload.get("stats", {}).get("Penalties", {}).get("total", 0)
-                        key = (alert.game_id, rule.id, alert.id)
-                        PENALTY_LAST_TOTAL[key] = penalties_total
-                    
-                    history_meta = {}
-                    try:
-                        history = fetch_match_history(session, game["url"])
-                        h2h_summary = summarize_history(history.get("h2h", []))
-                        home_summary = summarize_history(history.get("home", []))
-                        away_summary = summarize_history(history.get("away", []))
-                        h2h_items = history.get("h2h", [])
-                        history_meta = {
-                            "history_h2h": format_history_summary("H2H", h2h_summary) if h2h_summary else "Sem historico de um contra o outro",
-                            "history_home": format_history_summary("Home", home_summary),
-                            "history_away": format_history_summary("Away", away_summary),
-                        }
-                        conf_conds = [c for c in rule.outcome_conditions if c.outcome_type == "green"] or rule.conditions
-                        confidence = history_confidence(conf_conds, h2h_items)
-                        history_meta["history_confidence"] = f"{confidence}%" if confidence is not None else "Sem historico de um contra o outro"
-                    except Exception:
-                        history_meta = {}
-                    meta = build_message_meta(rule, stats_payload, game, history_meta, stats_override=stats_for_rule)
-                    if rule.notify_telegram and user.telegram_token and user.telegram_chat_id:
-                        send_message(user.telegram_token, user.telegram_chat_id, render_message(rule, meta))
-                except IntegrityError:
-                    db.session.rollback()
-        time.sleep(GAME_DELAY)
+def second_half_view(game_id, stats_payload):
+    minute = stats_payload.get("minute") or 0
+    if is_first_half_extra_time(stats_payload.get("time_text", "")):
+        return None
+    if minute < 46:
+        return None
+    baseline = SECOND_HALF_BASELINES.get(game_id)
+    if not baseline:
+        return None
+    stats = apply_second_half_delta(stats_payload["stats"], baseline)
+    m2h = max(0, minute - 45)
+    stats["Minute"] = {"home": m2h, "away": m2h, "total": m2h}
+    return stats
+
+def condition_shortfall(cond, stats: dict):
+    value = stats.get(cond.stat_key, {}).get(cond.side)
+    if value is None:
+        return None
+    if cond.test(value, cond.value):
+        return 0
+    if cond.operator in (">=", ">", "=="):
+        target = cond.value + 1 if cond.operator == ">" else cond.value
+        if value < target:
+            return target - value
+    # "<" e "<=" que ja falharam nao voltam a valer com contadores crescentes
+    return None
+
+def rule_is_near(rule, compiled, game_id, views, score) -> bool:
+    h_score, a_score = score
+    if (rule.score_home is not None and h_score != rule.score_home) or \
+       (rule.score_away is not None and a_score != rule.score_away):
+        return False
+    stats = views[bool(rule.second_half_only)]
+    if stats is None:
+        return False
+    for conds in DEAD_GROUPS.live(game_id, rule.id, compiled):
+        missing = 0
+        for cond in conds:
+            shortfall = condition_shortfall(cond, stats)
+            if shortfall is None:
+                break
+            missing += shortfall
+        else:
+            if missing <= NEAR_MARGIN:
+                return True
+    return False
+
+def any_rule_near(cycle, game_id, views, score) -> bool:
+    # A ancora de cada grupo, com folga NEAR_MARGIN, separa as poucas regras que podem estar perto;
+    # so elas passam pela conta exata (um grupo perto tem a ancora faltando no maximo NEAR_MARGIN)
+    found = RULE_INDEX.candidates_for(views[False], views[True], slack=NEAR_MARGIN)
+    for rule_id in found:
+        position = cycle.positions[rule_id]
+        if rule_is_near(cycle.active_rules[position], cycle.compiled[position], game_id, views, score):
+            return True
+    return False
+
+def poll_interval(game_id, stats_payload, cycle, views, score, has_open_alert: bool) -> int:
+    if has_open_alert:
+        return POLL_HOT
+    minute = stats_payload.get("minute")
+    if minute is None:
+        return POLL_HOT
+    if is_half_time_text(stats_payload.get("time_text", "")):
+        return POLL_HALFTIME
+    # Janela em que a baseline do 2o tempo e capturada
+    if 44 <= minute <= 47:
+        return POLL_HOT
+    if any_rule_near(cycle, game_id, views, score):
+        return POLL_HOT
+    return POLL_COLD if minute < 10 else POLL_WARM
+
+def evaluate_game_rules(game, stats_payload, active_rules, views, score):
+    h_score, a_score = score
+    DEAD_GROUPS.observe_score(game["game_id"], h_score, a_score)
+    diffs = {}
+    found = []
+    for rule in active_rules:
+        if ALERT_INDEX.contains(rule.id, game["game_id"]): continue
+        compiled = COMPILED_RULES.get(rule)
+        groups = DEAD_GROUPS.live(game["game_id"], rule.id, compiled)
+        if not groups: continue
+
+        if (rule.score_home is not None and h_score != rule.score_home) or \
+           (rule.score_away is not None and a_score != rule.score_away):
+            continue
+
+        second_half = bool(rule.second_half_only)
+        stats_for_rule = views[second_half]
+        if stats_for_rule is None:
+            continue
+        if second_half not in diffs:
+            diffs[second_half] = STATS_DIFF.view((game["game_id"], second_half), stats_for_rule)
+        # Falhou no ultimo poll e nenhuma chave que a regra le mudou: nao reavalia
+        if diffs[second_half].still_false(rule.id, compiled, compiled.reads):
+            continue
+
+        if not evaluate_groups(groups, stats_for_rule):
+            diffs[second_half].record_false(rule.id, compiled)
+            # Visao do 2o tempo e delta sobre a baseline fixa: continua so crescendo
+            DEAD_GROUPS.update(game["game_id"], rule.id, compiled, stats_for_rule)
+        else:
+            user = rule.user
+            if not user:
+                continue
+            if rule.notify_telegram and (not user.telegram_token or not user.telegram_chat_id):
+                continue
+            found.append((rule, compiled, game, stats_payload, stats_for_rule))
+    # Os alertas do jogo seguem juntos: o persist grava tudo que estiver na fila num commit
+    if found:
+        PERSIST.put(found)
+
+def new_alert(item):
+    rule, _, game, stats_payload, stats_for_rule = item
+    minute = stats_payload.get("minute")
+    return MatchAlert(
+        rule_id=rule.id, user_id=rule.user.id, game_id=game["game_id"], url=game["url"],
+        status="pending", alert_minute=minute, initial_score=stats_payload["score"],
+        last_score=stats_payload["score"], last_score_minute=minute,
+        initial_stats_json=stats_to_json(stats_for_rule),
+        league=stats_payload.get("league"), home_team=stats_payload.get("home_team"),
+        away_team=stats_payload.get("away_team")
+    )
+
+def touch_rule(item):
+    rule, _, _, stats_payload, _ = item
+    # A regra do snapshot esta fora da sessao: grava direto na linha
+    Rule.query.filter_by(id=rule.id).update(
+        {"last_alert_at": now_sp(), "last_alert_desc": f"{stats_payload.get('home_team')} vs {stats_payload.get('away_team')}"}
+    )
+
+def persist_alerts(batches):
+    # Um commit para o lote (alertas + ultima ocorrencia das regras); se alguma linha ja existe
+    # (outro processo gravou antes) o lote volta e cada alerta e gravado sozinho
+    items = [item for batch in batches for item in batch]
+    alerts = [new_alert(item) for item in items]
+    db.session.add_all(alerts)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        for item in items:
+            persist_alert(item)
+        return
+    saved = [alert.id for alert in alerts]
+    for item in items:
+        touch_rule(item)
+    db.session.commit()
+    for item, alert_id in zip(items, saved):
+        alert_saved(item, alert_id)
+
+def persist_alert(item):
+    rule, _, game, _, _ = item
+    alert = new_alert(item)
+    db.session.add(alert)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        ALERT_INDEX.add(rule.id, game["game_id"])
+        return
+    alert_id = alert.id
+    touch_rule(item)
+    db.session.commit()
+    alert_saved(item, alert_id)
+
+def alert_saved(item, alert_id):
+    rule, compiled, game, stats_payload, stats_for_rule = item
+    ALERT_INDEX.add(rule.id, game["game_id"])
+    if rule.alert_on_penalty:
+        penalties_total = stats_payload.get("stats", {}).get("Penalties", {}).get("total", 0)
+        key = (game["game_id"], rule.id, alert_id)
+        PENALTY_LAST_TOTAL[key] = penalties_total
+    NOTIFY.put(partial(announce_alert, rule, compiled, game, stats_payload, stats_for_rule), key=game["game_id"])
+
+def announce_alert(rule, compiled, game, stats_payload, stats_for_rule):
+    user = rule.user
+    history_meta = {}
+    try:
+        history = get_match_history(notify_session(), game["url"], game["game_id"])
+        h2h_summary = summarize_history(history.get("h2h", []))
+        home_summary = summarize_history(history.get("home", []))
+        away_summary = summarize_history(history.get("away", []))
+        h2h_items = history.get("h2h", [])
+        history_meta = {
+            "history_h2h": format_history_summary("H2H", h2h_summary) if h2h_summary else "Sem historico de um contra o outro",
+            "history_home": format_history_summary("Home", home_summary),
+            "history_away": format_history_summary("Away", away_summary),
+        }
+        conf_conds = compiled.green or [cond for conds in compiled.groups for cond in conds]
+        confidence = history_confidence(conf_conds, h2h_items)
+        history_meta["history_confidence"] = f"{confidence}%" if confidence is not None else "Sem historico de um contra o outro"
+    except Exception:
+        history_meta = {}
+    meta = build_message_meta(rule, stats_payload, game, history_meta, stats_override=stats_for_rule)
+    # Historico (rede) e texto ficam prontos antes de gravar: a escrita no outbox e curta e fecha no commit,
+    # nunca segura o lock do SQLite durante uma requisicao
+    if rule.notify_telegram and user.telegram_token and user.telegram_chat_id:
+        queue_message(user.telegram_token, user.telegram_chat_id, render_message(rule, meta))
+
+def notify_session():
+    # requests.Session nao e thread-safe: uma por thread do notify
+    session = getattr(NOTIFY_LOCAL, "session", None)
+    if session is None:
+        session = NOTIFY_LOCAL.session = make_session()
+    return session
+
+def export_saved_alert(alert_id):
+    alert = db.session.get(MatchAlert, alert_id)
+    if alert:
+        export_alert(alert, alert.rule.name, EXPORT_DIR)
 
 def build_message_meta(rule, stats_payload, game, history_meta=None, stats_override=None):
     stats = stats_override if isinstance(stats_override, dict) else stats_payload.get("stats", {})
@@ -410,11 +870,24 @@ def build_message_meta(rule, stats_payload, game, history_meta=None, stats_overr
         meta.update(history_meta)
     return meta
 
-def follow_alerts(session):
+def follow_alerts(engine, snapshots):
+    # Um commit para todos os alertas; export e notify entram so depois dele (export le a linha gravada).
+    # Rodam fora de check_alerts para os alertas ja terem saido da sessao: cada commit expira todo objeto
+    # carregado, e com centenas de alertas abertos os commits por alerta dominavam o ciclo.
+    after_commit = []
+    check_alerts(engine, snapshots, after_commit)
+    db.session.commit()
+    for task in after_commit:
+        task()
+
+def check_alerts(engine, snapshots, after_commit):
     active_alerts = MatchAlert.query.filter(MatchAlert.status.in_(("pending", "green", "red"))).all()
+    active_alerts = [alert for alert in active_alerts if SHARDS.owns(alert.game_id)]
+    snapshots.prefetch(engine, [(alert.game_id, alert.url) for alert in active_alerts], priority="follow")
     for alert in active_alerts:
-        rule = alert.rule
-        stats_payload = fetch_match_stats(session, alert.url)
+        rule = RULE_SNAPSHOT.get(alert.rule_id) or alert.rule
+        user = rule.user if rule else alert.user
+        stats_payload = snapshots.peek(alert.game_id)
         if not stats_payload: continue
 
         ensure_second_half_baseline(alert.game_id, stats_payload)
@@ -431,6 +904,7 @@ def follow_alerts(session):
             if prev_minute is not None and minute < prev_minute:
                 pass
             elif curr_total < prev_total or curr_home < prev_home or curr_away < prev_away:
+                DEAD_GROUPS.reset(alert.game_id)
                 alert.status = "pending"
                 alert.result_minute = None
                 alert.result_time_hhmm = None
@@ -438,23 +912,26 @@ def follow_alerts(session):
                 alert.ht_stats_json = None
                 alert.last_score = current_score
                 alert.last_score_minute = minute
-                db.session.commit()
-                if rule and rule.notify_telegram and alert.user.telegram_token and alert.user.telegram_chat_id:
-                    send_message(
-                        alert.user.telegram_token,
-                        alert.user.telegram_chat_id,
-                        f"⚠️ Gol anulado detectado. Status voltou para pendente.\nRegra: {alert.rule.name}\n{alert.home_team} vs {alert.away_team}\nTempo: {minute}'\nPlacar: {current_score}\nLink: {alert.url}",
-                    )
+                if rule and rule.notify_telegram and user.telegram_token and user.telegram_chat_id:
+                    after_commit.append(partial(
+                        NOTIFY.put,
+                        partial(
+                            queue_message,
+                            user.telegram_token,
+                            user.telegram_chat_id,
+                            f"⚠️ Gol anulado detectado. Status voltou para pendente.\nRegra: {rule.name}\n{alert.home_team} vs {alert.away_team}\nTempo: {minute}'\nPlacar: {current_score}\nLink: {alert.url}",
+                        ),
+                        key=alert.game_id,
+                    ))
                 continue
 
         if current_score:
             alert.last_score = current_score
             alert.last_score_minute = minute
-            db.session.commit()
 
         maybe_notify_penalty(
             rule,
-            alert.user,
+            user,
             alert.game_id,
             stats,
             minute,
@@ -471,44 +948,50 @@ def follow_alerts(session):
 
         if rule and rule.second_half_only:
             baseline = SECOND_HALF_BASELINES.get(alert.game_id)
-            if baseline: stats = apply_second_half_delta(stats_payload["stats"], baseline)
+            # O payload e compartilhado entre as etapas do ciclo: nunca alterar no lugar
+            stats = apply_second_half_delta(stats_payload["stats"], baseline) if baseline else copy_stats(stats)
             m2h = max(0, minute - 45)
             stats["Minute"] = {"home": m2h, "away": m2h, "total": m2h}
 
-        green_conds = [c for c in rule.outcome_conditions if c.outcome_type == "green"] if rule else []
-        red_conds = [c for c in rule.outcome_conditions if c.outcome_type == "red"] if rule else []
+        compiled = COMPILED_RULES.get(rule) if rule else None
+        green_conds = compiled.green if compiled else ()
+        red_conds = compiled.red if compiled else ()
 
-        base_stats = None
-        if alert.initial_stats_json:
-            try:
-                base_stats = json.loads(alert.initial_stats_json)
-            except Exception:
-                base_stats = None
-        stats_for_outcome = apply_alert_delta(stats, base_stats, minute, alert.alert_minute) if base_stats else stats
-        
-        # 1. Verificar GREEN customizado
-        if green_conds and evaluate_outcome_conditions(green_conds, stats_for_outcome):
-            update_alert_status(alert, "green", minute, current_score, stats, "✅ GREEN - condições atingidas")
-            continue
+        # Green/red so sao recalculados quando muda alguma chave que eles leem (o delta do alerta parte de base fixa)
+        outcome = STATS_DIFF.view((alert.game_id, "alert", alert.id), stats) if green_conds or red_conds else None
+        if outcome and not outcome.still_false(alert.id, compiled, compiled.outcome_reads):
+            base_stats = None
+            if alert.initial_stats_json:
+                try:
+                    base_stats = json.loads(alert.initial_stats_json)
+                except Exception:
+                    base_stats = None
+            stats_for_outcome = apply_alert_delta(stats, base_stats, minute, alert.alert_minute) if base_stats else stats
 
-        # 2. Verificar RED customizado
-        if red_conds and evaluate_outcome_conditions(red_conds, stats_for_outcome):
-            update_alert_status(alert, "red", minute, current_score, stats, "❌ RED - condições de RED atingidas")
-            continue
+            # 1. Verificar GREEN customizado
+            if green_conds and evaluate_compiled(green_conds, stats_for_outcome):
+                update_alert_status(alert, "green", minute, current_score, stats, "✅ GREEN - condições atingidas", after_commit)
+                continue
+
+            # 2. Verificar RED customizado
+            if red_conds and evaluate_compiled(red_conds, stats_for_outcome):
+                update_alert_status(alert, "red", minute, current_score, stats, "❌ RED - condições de RED atingidas", after_commit)
+                continue
+            outcome.record_false(alert.id, compiled)
 
         # 3. Verificar RED por tempo (se habilitado)
         if should_time_red(rule, alert, minute):
-            update_alert_status(alert, "red", minute, current_score, stats, "❌ RED - prazo do GREEN expirou")
+            update_alert_status(alert, "red", minute, current_score, stats, "❌ RED - prazo do GREEN expirou", after_commit)
             continue
 
         # 4. Lógica padrão (se não houver condições customizadas)
         if not green_conds and not red_conds:
             if alert.initial_score and current_score != alert.initial_score and is_first_half_goal(stats_payload.get("time_text", ""), minute):
-                update_alert_status(alert, "green", minute, current_score, stats, "✅ GREEN - gol no 1o tempo")
+                update_alert_status(alert, "green", minute, current_score, stats, "✅ GREEN - gol no 1o tempo", after_commit)
             elif is_half_time(stats_payload.get("time_text", ""), minute):
-                update_alert_status(alert, "red", minute, current_score, stats, "❌ RED - fim do 1o tempo sem gol")
+                update_alert_status(alert, "red", minute, current_score, stats, "❌ RED - fim do 1o tempo sem gol", after_commit)
 
-def update_alert_status(alert, status, minute, score, stats, msg_prefix):
+def update_alert_status(alert, status, minute, score, stats, msg_prefix, after_commit):
     alert.status = status
     alert.result_minute = minute
     alert.result_time_hhmm = now_sp().strftime("%H:%M")
@@ -516,26 +999,53 @@ def update_alert_status(alert, status, minute, score, stats, msg_prefix):
     alert.ht_stats_json = stats_to_json(stats)
     alert.last_score = score
     alert.last_score_minute = minute
-    db.session.commit()
-    export_alert(alert, alert.rule.name, EXPORT_DIR)
+    after_commit.append(partial(EXPORT.put, alert.id))
     if alert.rule and alert.rule.notify_telegram and alert.user.telegram_token and alert.user.telegram_chat_id:
-        send_message(
-            alert.user.telegram_token,
-            alert.user.telegram_chat_id,
-            f"{msg_prefix}\nRegra: {alert.rule.name}\n{alert.home_team} vs {alert.away_team}\nTempo: {minute}'\nPlacar: {score}\nLink: {alert.url}",
-        )
+        after_commit.append(partial(
+            NOTIFY.put,
+            partial(
+                queue_message,
+                alert.user.telegram_token,
+                alert.user.telegram_chat_id,
+                f"{msg_prefix}\nRegra: {alert.rule.name}\n{alert.home_team} vs {alert.away_team}\nTempo: {minute}'\nPlacar: {score}\nLink: {alert.url}",
+            ),
+            key=alert.game_id,
+        ))
 
-def finalize_full_time(session):
-    for alert in MatchAlert.query.filter_by(ft_completed=False).all():
-        stats_payload = fetch_match_stats(session, alert.url)
+def finalize_full_time(engine, snapshots):
+    open_alerts = [alert for alert in MatchAlert.query.filter_by(ft_completed=False) if SHARDS.owns(alert.game_id)]
+    snapshots.prefetch(engine, [(alert.game_id, alert.url) for alert in open_alerts], priority="finalize")
+    finished = []
+    for alert in open_alerts:
+        stats_payload = snapshots.peek(alert.game_id)
         if not stats_payload: continue
         minute = stats_payload.get("minute") or 0
         if is_full_time(stats_payload.get("time_text", ""), minute):
             alert.ft_score = stats_payload.get("score")
             alert.ft_stats_json = stats_to_json(stats_payload["stats"])
             alert.ft_completed = True
-            db.session.commit()
-            export_alert(alert, alert.rule.name, EXPORT_DIR)
+            finished.append(alert.id)
             SECOND_HALF_BASELINES.pop(alert.game_id, None)
             HALFTIME_SEEN_AT.pop(alert.game_id, None)
-        time.sleep(0.4)
+    # Mesmo esquema de follow_alerts: um commit so, export depois dele
+    db.session.commit()
+    for alert_id in finished:
+        EXPORT.put(alert_id)
+
+def pipeline_stats() -> dict:
+    stats = {"listing": dict(LISTING_STATS)}
+    for stage in STAGES:
+        stats[stage.name] = stage.stats()
+    return stats
+
+# listing (thread do worker) -> fetch -> parse -> evaluate -> persist -> notify / export.
+# Evaluate e persist ficam em uma thread: mexem no estado por jogo do modulo e o SQLite aceita um escritor;
+# export tambem, porque as planilhas sao lidas e regravadas inteiras a cada alerta.
+FETCH = Stage("fetch", fetch_page, workers=MAX_IN_FLIGHT)
+PARSE = Stage("parse", parse_page, workers=PARSE_THREADS)
+EVALUATE = Stage("evaluate", evaluate_pages, batch=QUEUE_SIZE)
+PERSIST = Stage("persist", persist_alerts, batch=QUEUE_SIZE)
+# notify monta a mensagem (historico, confianca) e grava no outbox; o envio e do OUTBOX
+NOTIFY = Stage("notify", lambda task: task(), workers=NOTIFY_THREADS)
+EXPORT = Stage("export", export_saved_alert)
+STAGES = (FETCH, PARSE, EVALUATE, PERSIST, NOTIFY, EXPORT)
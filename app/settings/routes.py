@@ -3,6 +3,7 @@ from flask_login import current_user, login_required
 
 from ..extensions import db
 from ..models import User
+from ..services.rule_snapshot import bump_rules_version
 from ..services.telegram import send_message
 
 settings_bp = Blueprint("settings", __name__, url_prefix="/settings")
@@ -60,6 +61,8 @@ def settings():
             current_user.telegram_verified = False
         current_user.telegram_token = new_token
         current_user.telegram_chat_id = new_chat
+        # O worker guarda o usuario junto das regras: token novo precisa recarregar o snapshot
+        bump_rules_version()
         db.session.commit()
         flash("Configuracoes atualizadas.", "success")
         return redirect(url_for("settings.settings"))
@@ -0,0 +1,66 @@
+"""Worker fora do processo web, dividido em N processos.
+
+Cada processo registra uma linha em worker_lease e fica com os jogos que o hash consistente
+de game_id aponta para ele. Se um processo morre, os outros assumem os jogos dele quando o
+heartbeat expira (WORKER_LEASE_TTL). Pode rodar em mais de uma maquina com o mesmo banco.
+
+Uso (com DISABLE_WORKER=1 no servidor web):
+    python -m app.worker_main --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+RESTART_DELAY = 5
+
+
+def run_shard() -> None:
+    # create_app nao sobe a thread do worker; o processo roda o loop direto
+    os.environ["DISABLE_WORKER"] = "1"
+    from app import create_app
+    from app.services.shards import SHARDS
+    from app.services.worker import run_worker
+
+    # Filho do multiprocessing sai por os._exit (sem atexit): libera a lease aqui para a troca ser imediata
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        run_worker(create_app(), sharded=True)
+    finally:
+        SHARDS.release()
+
+
+def spawn(index: int) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=run_shard, name=f"worker-{index}", daemon=True)
+    process.start()
+    print(f"[shards] worker-{index} iniciado (pid {process.pid})")
+    return process
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=int(os.environ.get("WORKER_PROCESSES", "2")))
+    args = parser.parse_args()
+
+    # systemd/docker param com SIGTERM: desce os filhos junto para as leases serem liberadas
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    processes = [spawn(index) for index in range(max(1, args.processes))]
+    try:
+        while True:
+            time.sleep(RESTART_DELAY)
+            # Enquanto o processo novo nao sobe, os jogos do que caiu ficam com os outros
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"[shards] worker-{index} saiu (codigo {process.exitcode}); reiniciando")
+                    processes[index] = spawn(index)
+    except (KeyboardInterrupt, SystemExit):
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Paridade e microbenchmark dos backends de parser do scraper.
+
+Uso: python -m bench.parser [--rounds 50]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+from app.services.scraper import PARSER_BACKENDS, parse_live_games, parse_match_stats
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixtures():
+    with open(os.path.join(FIXTURES_DIR, "index.json"), encoding="utf-8") as handle:
+        index = json.load(handle)
+    fixtures = []
+    for name, meta in sorted(index.items()):
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as handle:
+            fixtures.append((name, meta["kind"], meta["url"], handle.read()))
+    return fixtures
+
+
+def parse_fixture(kind: str, url: str, html: str, backend: str):
+    if kind == "listing":
+        return parse_live_games(html, url, backend=backend)
+    return parse_match_stats(html, url, backend=backend)
+
+
+def check_parity(fixtures) -> bool:
+    ok = True
+    for name, kind, url, html in fixtures:
+        expected = parse_fixture(kind, url, html, "reference")
+        for backend in PARSER_BACKENDS:
+            result = parse_fixture(kind, url, html, backend)
+            if result != expected:
+                ok = False
+                print(f"[paridade] {name}: backend '{backend}' difere da referencia")
+                print(f"  esperado: {expected}")
+                print(f"  obtido:   {result}")
+        if not expected:
+            ok = False
+            print(f"[paridade] {name}: referencia nao extraiu nada")
+    return ok
+
+
+def run_benchmark(fixtures, rounds: int) -> None:
+    print(f"{'fixture':32} " + " ".join(f"{backend:>12}" for backend in PARSER_BACKENDS) + "   ganho")
+    for name, kind, url, html in fixtures:
+        timings = {}
+        for backend in PARSER_BACKENDS:
+            elapsed = timeit.timeit(lambda: parse_fixture(kind, url, html, backend), number=rounds)
+            timings[backend] = elapsed / rounds * 1000
+        speedup = timings["reference"] / timings["fast"] if timings.get("fast") else 0
+        cols = " ".join(f"{timings[backend]:>10.2f}ms" for backend in PARSER_BACKENDS)
+        print(f"{name:32} {cols}   {speedup:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    fixtures = load_fixtures()
+    if not check_parity(fixtures):
+        sys.exit(1)
+    print(f"paridade ok em {len(fixtures)} fixtures")
+    run_benchmark(fixtures, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Servidor local que substitui o BetsAPI e a API do Telegram em benchmarks.
+
+Modo sintetico (padrao): gera N jogos com relogio acelerado.
+    python -m bench.replay_server --games 200 --speed 30 --latency 0.05
+
+Modo replay: serve o que foi gravado com SCRAPER_RECORD_DIR.
+    python -m bench.replay_server --fixtures data/recordings --speed 1
+
+Apontando o app para ele:
+    BETSAPI_BASE_URLS=http://127.0.0.1:8765 TELEGRAM_API_BASE=http://127.0.0.1:8765 \\
+    BETSAPI_REQUESTS_PER_MINUTE=100000 WORKER_HOST_INTERVAL=0 python app.py
+
+Com --mirror-port sobe um segundo host (o "pt.betsapi.com") com a mesma
+partida e latencia propria; coloque os dois em BETSAPI_BASE_URLS.
+Contadores em GET /__stats.
+"""
+import argparse
+import bisect
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LEAGUES = (
+    "England Premier League",
+    "Spain LaLiga",
+    "Brazil Serie A",
+    "Germany Bundesliga",
+    "Japan J1",
+    "Argentina Liga Profesional",
+    "Italy Serie A",
+    "Brazil U20 Championship",
+)
+# Duracao do jogo no relogio do servidor, em minutos (com intervalo e acrescimos)
+FIRST_HALF_END = 47
+SECOND_HALF_START = 62
+GAME_END = 110
+GAME_SPAN = 115
+STAT_RATES = (
+    ("Goals", 0.005, 0.025),
+    ("Corners", 0.03, 0.12),
+    ("Yellow Card", 0.01, 0.04),
+    ("Attacks", 0.8, 1.4),
+    ("Dangerous Attacks", 0.4, 0.9),
+    ("On Target", 0.02, 0.12),
+    ("Off Target", 0.03, 0.12),
+    ("Penalties", 0.0, 0.004),
+)
+
+
+class Clock:
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return (time.monotonic() - self.started) * self.speed
+
+
+class SyntheticSource:
+    def __init__(self, games: int, clock: Clock, seed: int):
+        self.games = games
+        self.clock = clock
+        self.seed = seed
+
+    def _slot(self, game_id: int):
+        index = (game_id - 10_000_000) % self.games
+        return index, (game_id - 10_000_000) // self.games
+
+    def _game_clock(self, index: int) -> tuple:
+        # Cada jogo comeca num ponto diferente; ao terminar, o slot recebe um jogo novo
+        offset = index * GAME_SPAN / self.games
+        total = offset + self.clock.elapsed() / 60.0
+        return int(total // GAME_SPAN), total % GAME_SPAN
+
+    def _game_id(self, index: int, generation: int) -> int:
+        return 10_000_000 + generation * self.games + index
+
+    def _phase(self, t: float) -> tuple:
+        if t < 45:
+            return f"{int(t)}'", t
+        if t < FIRST_HALF_END:
+            return f"45+{int(t - 45) + 1}", 45
+        if t < SECOND_HALF_START:
+            return "HT", 45
+        if t < SECOND_HALF_START + 45:
+            return f"2nd {int(t - SECOND_HALF_START)}'", 45 + (t - SECOND_HALF_START)
+        if t < GAME_END:
+            return f"90+{int(t - SECOND_HALF_START - 45) + 1}", 90
+        return "FT", 90
+
+    def _stats(self, game_id: int, played: float) -> dict:
+        rng = random.Random(self.seed * 100_003 + game_id)
+        stats = {}
+        for key, low, high in STAT_RATES:
+            stats[key] = tuple(int(played * rng.uniform(low, high) + rng.random()) for _ in range(2))
+        home_pos = rng.randint(35, 65)
+        stats["Possession"] = (home_pos, 100 - home_pos)
+        return stats
+
+    def _league(self, game_id: int) -> str:
+        return LEAGUES[game_id % len(LEAGUES)]
+
+    def listing(self) -> str:
+        rows = []
+        for index in range(self.games):
+            generation, t = self._game_clock(index)
+            time_text, _ = self._phase(t)
+            if t >= GAME_END:
+                continue
+            game_id = self._game_id(index, generation)
+            rows.append(
+                f'<tr id="r_{game_id}" class="table-row"><td class="sport_n"><a href="/c/soccer">S</a></td>'
+                f'<td class="league_n"><a href="/l/1/x">{self._league(game_id)}</a></td>'
+                f'<td><span class="race-time">{time_text}</span></td>'
+                f'<td class="text-right"><a href="/r/{game_id}/Home-{game_id}-vs-Away-{game_id}">'
+                f"Home {game_id} v Away {game_id}</a></td></tr>"
+            )
+        return (
+            "<!DOCTYPE html><html><head><title>BetsAPI - In-Play</title></head><body>"
+            '<table class="table">' + "".join(rows) + "</table></body></html>"
+        )
+
+    def match(self, game_id: int):
+        index, generation = self._slot(game_id)
+        current, t = self._game_clock(index)
+        if generation > current:
+            return None
+        if generation < current:
+            t = GAME_SPAN
+        time_text, played = self._phase(t)
+        stats = self._stats(game_id, played)
+        home, away = f"Home {game_id}", f"Away {game_id}"
+        league = self._league(game_id)
+        rows = [f"<tr><td>{home}</td><td>{stats['Goals'][0]} - {stats['Goals'][1]}</td><td>{away}</td></tr>"]
+        for key, (home_val, away_val) in stats.items():
+            rows.append(
+                f'<tr><td><span class="sr-only">{home_val}</span></td><td>{key}</td>'
+                f'<td><span class="sr-only">{away_val}</span></td></tr>'
+            )
+        return (
+            f"<!DOCTYPE html><html><head><title>{home} vs {away} - {league} - BetsAPI</title></head><body>"
+            f'<ol class="breadcrumb"><li class="breadcrumb-item"><a href="/">Home</a></li>'
+            f'<li class="breadcrumb-item"><a href="/l/1/x">{league}</a></li></ol>'
+            f'<h1>{home} vs {away}</h1><span class="race-time">{time_text}</span>'
+            '<table class="table table-sm">' + "".join(rows) + "</table></body></html>"
+        )
+
+    def history(self, game_id: int) -> str:
+        rng = random.Random(self.seed * 7_919 + game_id)
+        sections = []
+        for label, size in (("Head to Head", 8), ("Home History", 6), ("Away History", 6)):
+            rows = "".join(
+                f"<tr><td>Team A</td><td>{rng.randint(0, 3)} - {rng.randint(0, 3)}</td><td>Team B</td></tr>"
+                for _ in range(size)
+            )
+            sections.append(f'<div><h3>{label}</h3><table class="table">{rows}</table></div>')
+        return "<!DOCTYPE html><html><body>" + "".join(sections) + "</body></html>"
+
+
+class RecordedSource:
+    def __init__(self, root: str, clock: Clock):
+        self.clock = clock
+        self.listings = self._load(os.path.join(root, "listing", ""))
+        self.matches = self._load_dir(os.path.join(root, "r"))
+        self.histories = self._load_dir(os.path.join(root, "rh"))
+        stamps = [stamp for stamp, _ in self.listings]
+        for recorded in list(self.matches.values()) + list(self.histories.values()):
+            stamps.extend(stamp for stamp, _ in recorded)
+        self.start = min(stamps) if stamps else 0
+
+    def _load(self, folder: str):
+        recorded = []
+        if not os.path.isdir(folder):
+            return recorded
+        for name in os.listdir(folder):
+            if name.endswith(".html"):
+                recorded.append((int(name[:-5]), os.path.join(folder, name)))
+        recorded.sort()
+        return recorded
+
+    def _load_dir(self, folder: str) -> dict:
+        if not os.path.isdir(folder):
+            return {}
+        return {int(name): self._load(os.path.join(folder, name)) for name in os.listdir(folder) if name.isdigit()}
+
+    def _at_clock(self, recorded):
+        # Ultima gravacao ate o instante atual do relogio; antes disso, a primeira
+        if not recorded:
+            return None
+        now = self.start + int(self.clock.elapsed() * 1e9)
+        index = max(0, bisect.bisect_right(recorded, now, key=lambda item: item[0]) - 1)
+        with open(recorded[index][1], encoding="utf-8") as handle:
+            return handle.read()
+
+    def listing(self):
+        return self._at_clock(self.listings)
+
+    def match(self, game_id: int):
+        return self._at_clock(self.matches.get(game_id))
+
+    def history(self, game_id: int):
+        return self._at_clock(self.histories.get(game_id))
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ROUTES = (
+        (re.compile(r"^/rh/(\d+)"), "history"),
+        (re.compile(r"^/r/(\d+)"), "match"),
+    )
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self) -> None:
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(self, status: int, body: str, content_type="text/html; charset=utf-8") -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _count(self, key: str) -> None:
+        with self.server.state["lock"]:
+            counters = self.server.state["counters"]
+            counters[key] = counters.get(key, 0) + 1
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/__stats":
+            with self.server.state["lock"]:
+                body = json.dumps(self.server.state["counters"])
+            return self._send(200, body, "application/json")
+        self._delay()
+        if random.random() < self.server.block_rate:
+            self._count("blocked")
+            return self._send(429, "Too Many Requests")
+        source = self.server.state["source"]
+        if path in ("", "/"):
+            self._count("listing")
+            body = source.listing()
+            return self._send(200, body) if body else self._send(404, "")
+        for pattern, kind in self.ROUTES:
+            match = pattern.match(path)
+            if match:
+                self._count(kind)
+                body = getattr(source, kind)(int(match.group(1)))
+                return self._send(200, body) if body else self._send(404, "")
+        self._send(404, "")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._delay()
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/bot") and path.rsplit("/", 1)[-1] in ("sendMessage", "sendDocument"):
+            self._count("telegram")
+            return self._send(200, json.dumps({"ok": True, "result": {}}), "application/json")
+        self._send(404, "")
+
+
+def make_server(host: str, port: int, state: dict, latency=0.0, jitter=0.0, block_rate=0.0):
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.daemon_threads = True
+    server.state = state
+    server.latency = latency
+    server.jitter = jitter
+    server.block_rate = block_rate
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mirror-port", type=int, default=0)
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--speed", type=float, default=1.0, help="segundos de jogo por segundo real")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--mirror-latency", type=float, default=None)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--block-rate", type=float, default=0.0, help="fracao de respostas 429")
+    parser.add_argument("--fixtures", default="", help="pasta gravada com SCRAPER_RECORD_DIR")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    clock = Clock(args.speed)
+    if args.fixtures:
+        source = RecordedSource(args.fixtures, clock)
+    else:
+        source = SyntheticSource(max(1, args.games), clock, args.seed)
+    state = {"source": source, "counters": {}, "lock": threading.Lock()}
+    servers = [make_server(args.host, args.port, state, args.latency, args.jitter, args.block_rate)]
+    if args.mirror_port:
+        mirror_latency = args.latency if args.mirror_latency is None else args.mirror_latency
+        servers.append(make_server(args.host, args.mirror_port, state, mirror_latency, args.jitter, args.block_rate))
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    bases = ",".join(f"http://{args.host}:{server.server_address[1]}" for server in servers)
+    print(f"replay em {bases} ({'gravacao' if args.fixtures else f'{args.games} jogos sinteticos'})")
+    try:
+        servers[0].serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers[1:]:
+            server.shutdown()
+        for server in servers:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
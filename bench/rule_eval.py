@@ -0,0 +1,191 @@
+"""Paridade e microbenchmark da avaliacao em lote (NumPy) e do indice de limiares contra o caminho escalar.
+
+Gera regras e jogos sinteticos, confere que o lote e o indice dao exatamente os mesmos
+pares (jogo, regra) que evaluate_groups e mede os tres caminhos.
+
+Uso: python -m bench.rule_eval [--rules 100,1000,10000] [--games 60] [--rounds 5]
+"""
+import argparse
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from app.services.batch_eval import BatchEvaluator, np
+from app.services.evaluator import CompiledRuleCache, compile_rule, evaluate_groups
+from app.services.rule_index import ThresholdIndex
+
+STAT_KEYS = ("On Target", "Off Target", "Corners", "Dangerous Attacks", "Attacks", "Goals", "Minute")
+OPERATORS = (">=", ">", "==", "<=", "<")
+
+
+def make_group(rng):
+    group = []
+    for _ in range(rng.randint(1, 3)):
+        key = rng.choice(STAT_KEYS)
+        group.append(
+            (
+                key,
+                "total" if key == "Minute" else rng.choice(("home", "away", "total")),
+                rng.choice(OPERATORS),
+                rng.randint(0, 60 if key == "Minute" else 12),
+            )
+        )
+    return group
+
+
+def make_rules(count: int, rng, shared: float = 0.5):
+    # Parte dos grupos sai de um punhado de "modelos populares", como usuarios copiando a mesma regra
+    templates = [make_group(rng) for _ in range(40)]
+    rules = []
+    for index in range(count):
+        conditions = []
+        for group_id in range(rng.choice((1, 1, 2, 3))):
+            group = rng.choice(templates) if rng.random() < shared else make_group(rng)
+            for key, side, operator, value in rng.sample(group, len(group)):
+                conditions.append(
+                    SimpleNamespace(stat_key=key, side=side, operator=operator, value=value, group_id=group_id)
+                )
+        scored = rng.random() < 0.15
+        rules.append(
+            SimpleNamespace(
+                id=index,
+                version=1,
+                created_at=None,
+                second_half_only=rng.random() < 0.2,
+                score_home=rng.randint(0, 1) if scored else None,
+                score_away=rng.randint(0, 1) if scored else None,
+                conditions=conditions,
+                outcome_conditions=[],
+            )
+        )
+    return rules
+
+
+def make_stats(rng, minute: int):
+    stats = {}
+    for key in STAT_KEYS:
+        if key != "Minute" and rng.random() < 0.1:
+            continue
+        home, away = (minute, minute) if key == "Minute" else (rng.randint(0, 10), rng.randint(0, 10))
+        stats[key] = {"home": home, "away": away, "total": minute if key == "Minute" else home + away}
+    return stats
+
+
+def make_rows(count: int, rng):
+    rows = []
+    for _ in range(count):
+        minute = rng.randint(1, 90)
+        second_half = make_stats(rng, minute - 45) if minute > 45 and rng.random() < 0.8 else None
+        rows.append((make_stats(rng, minute), second_half, rng.randint(0, 2), rng.randint(0, 2)))
+    return rows
+
+
+def matches_row(pairs, row):
+    full, second_half, home, away = row
+    matched = []
+    for rule, rule_compiled in pairs:
+        if (rule.score_home is not None and home != rule.score_home) or (
+            rule.score_away is not None and away != rule.score_away
+        ):
+            continue
+        stats = second_half if rule.second_half_only else full
+        if stats is not None and evaluate_groups(rule_compiled.groups, stats):
+            matched.append(rule)
+    return matched
+
+
+def scalar_matches(rules, compiled, rows):
+    pairs = list(zip(rules, compiled))
+    return [matches_row(pairs, row) for row in rows]
+
+
+def index_matches(index, rules, compiled, rows):
+    pairs = list(zip(rules, compiled))
+    return [matches_row([pairs[i] for i in sorted(index.candidates_for(row[0], row[1]))], row) for row in rows]
+
+
+def check_incremental(rules, compiled, rng) -> bool:
+    # Sincronizar aos poucos (regras saindo e voltando editadas) tem que dar o mesmo indice que montar do zero
+    index = ThresholdIndex()
+    index.sync(rules, compiled)
+    kept = [i for i in range(len(rules)) if rng.random() < 0.7]
+    index.sync([rules[i] for i in kept], [compiled[i] for i in kept])
+    edited = list(compiled)
+    for i in range(0, len(rules), 5):
+        edited[i] = compile_rule(rules[i])
+    index.sync(rules, edited)
+    fresh = ThresholdIndex()
+    fresh.sync(rules, edited)
+
+    def layout(built):
+        # Empates de limiar podem ficar em outra ordem sem mudar o resultado
+        return {key: sorted(zip(*bucket)) for key, bucket in built._buckets.items()}
+
+    return layout(index) == layout(fresh)
+
+
+def best_of(rounds: int, fn) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", default="100,1000,10000")
+    parser.add_argument("--games", type=int, default=60)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--shared", type=float, default=0.5, help="fracao dos grupos copiados de modelos populares")
+    args = parser.parse_args()
+    if np is None:
+        print("numpy nao instalado: avaliacao em lote indisponivel")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    rows = make_rows(args.games, rng)
+    print(
+        f"{'regras':>7} {'pares':>9} {'dedup':>6} {'escalar':>10} {'lote':>10} "
+        f"{'lote+matriz':>12} {'indice':>10}   ganho (lote / indice)"
+    )
+    for count in [int(value) for value in args.rules.split(",") if value.strip()]:
+        rules = make_rules(count, rng, args.shared)
+        compiled = [compile_rule(rule) for rule in rules]
+        evaluator = BatchEvaluator()
+        expected = scalar_matches(rules, compiled, rows)
+        obtained = evaluator.matches(rules, compiled, rows)
+        if [[rule.id for rule in row] for row in expected] != [[rule.id for rule in row] for row in obtained]:
+            print(f"[paridade] {count} regras: lote difere do caminho escalar")
+            sys.exit(1)
+        index = ThresholdIndex()
+        index.sync(rules, compiled)
+        if [[rule.id for rule in row] for row in expected] != [
+            [rule.id for rule in row] for row in index_matches(index, rules, compiled, rows)
+        ]:
+            print(f"[paridade] {count} regras: indice difere do caminho escalar")
+            sys.exit(1)
+        if not check_incremental(rules, compiled, rng):
+            print(f"[paridade] {count} regras: indice incremental difere do indice montado do zero")
+            sys.exit(1)
+        # Fracao de condicoes repetidas entre regras: o lote compara cada uma so uma vez
+        cache = CompiledRuleCache()
+        for rule in rules:
+            cache.get(rule)
+        scalar = best_of(args.rounds, lambda: scalar_matches(rules, compiled, rows))
+        batch = best_of(args.rounds, lambda: evaluator.matches(rules, compiled, rows))
+        cold = best_of(args.rounds, lambda: BatchEvaluator().matches(rules, compiled, rows))
+        indexed = best_of(args.rounds, lambda: index_matches(index, rules, compiled, rows))
+        print(
+            f"{count:>7} {count * len(rows):>9} {cache.stats()['condition_dedup']:>6.0%} {scalar * 1000:>8.1f}ms "
+            f"{batch * 1000:>8.1f}ms {cold * 1000:>10.1f}ms {indexed * 1000:>8.1f}ms   "
+            f"{scalar / batch:.1f}x / {scalar / indexed:.1f}x"
+        )
+    print("paridade ok")
+
+
+if __name__ == "__main__":
+    main()
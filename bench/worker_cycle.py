@@ -0,0 +1,374 @@
+"""Benchmark de ciclo completo do worker com banco SQLite descartavel.
+
+Semeia usuarios, regras (grupos OU, second_half_only, filtro de placar,
+condicoes de resultado) e alertas abertos; roda process_live_games,
+follow_alerts e finalize_full_time contra payloads prontos, sem rede.
+
+Uso: python -m bench.worker_cycle [--rules 10,100,1000] [--games 60] [--cycles 3] [--threads]
+
+Com 10000 regras o primeiro ciclo gera ~100 mil alertas (um commit de outbox
+por mensagem sem --threads) e leva varios minutos: so roda pedindo --rules.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+TMP_DIR = tempfile.mkdtemp(prefix="greenhunter-bench-")
+os.environ["DISABLE_WORKER"] = "1"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+os.environ["HISTORY_CACHE_PATH"] = os.path.join(TMP_DIR, "history_cache.db")
+os.environ["EXPORT_DIR"] = os.path.join(TMP_DIR, "exports")
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import MatchAlert, Rule, RuleCondition, RuleOutcomeCondition, TelegramOutbox, User  # noqa: E402
+from app.services import worker  # noqa: E402
+from app.services.scheduler import PollScheduler  # noqa: E402
+from app.services.snapshots import SnapshotCache  # noqa: E402
+
+# (chave, faixa de limiar para ">=", faixa para "<=")
+CONDITION_KEYS = (
+    ("On Target", (2, 9), (0, 3)),
+    ("Corners", (3, 12), (0, 4)),
+    ("Dangerous Attacks", (20, 80), (5, 30)),
+    ("Attacks", (40, 120), (10, 50)),
+    ("Goals", (1, 4), (0, 1)),
+    ("Minute", (10, 80), (15, 85)),
+)
+SIDES = ("home", "away", "total")
+GROWTH = {
+    "On Target": 0.08,
+    "Off Target": 0.08,
+    "Corners": 0.07,
+    "Dangerous Attacks": 0.6,
+    "Attacks": 1.1,
+    "Goals": 0.015,
+    "Penalties": 0.002,
+}
+
+
+class CannedEngine:
+    def __init__(self, feed):
+        self.feed = feed
+        self.fetched = 0
+
+    def fetch_stats(self, games, priority="new"):
+        for game in games:
+            self.fetched += 1
+            yield game, self.feed.payload(game["game_id"])
+
+    def download(self, url, priority="new"):
+        self.fetched += 1
+        return self.feed.payload(url.split("/r/")[1].split("/")[0])
+
+    def shutdown(self) -> None:
+        pass
+
+
+class EveryCycleScheduler(PollScheduler):
+    # Todo jogo entra em todo ciclo: mede o pior caso do laco de avaliacao
+    def due(self, games, now=None):
+        self.polled = len(games)
+        self.deferred = 0
+        return list(games)
+
+
+class GameFeed:
+    def __init__(self, games: int, seed: int):
+        rng = random.Random(seed)
+        self.games = {}
+        for index in range(games):
+            game_id = str(20_000_000 + index)
+            self.games[game_id] = {
+                "minute": rng.randint(1, 88),
+                "rates": {key: (rate * rng.uniform(0.5, 1.5), rate * rng.uniform(0.5, 1.5)) for key, rate in GROWTH.items()},
+                "league": "Brazil U20" if index % 17 == 0 else f"Liga {index % 9}",
+            }
+
+    def advance(self, minutes=1) -> None:
+        for game in self.games.values():
+            game["minute"] = min(95, game["minute"] + minutes)
+
+    def listing(self):
+        return [
+            {
+                "game_id": game_id,
+                "url": f"https://betsapi.com/r/{game_id}/Home-{game_id}-vs-Away-{game_id}",
+                "minute": game["minute"],
+                "time_text": self._time_text(game["minute"]),
+                "league": game["league"],
+            }
+            for game_id, game in self.games.items()
+            if game["minute"] < 95
+        ]
+
+    def _time_text(self, minute: int) -> str:
+        if minute >= 95:
+            return "FT"
+        if minute > 45:
+            return f"2nd {minute - 45}'"
+        return f"{minute}'"
+
+    def payload(self, game_id: str):
+        game = self.games.get(game_id)
+        if not game:
+            return None
+        minute = game["minute"]
+        stats = {}
+        for key, (home_rate, away_rate) in game["rates"].items():
+            home, away = int(minute * home_rate), int(minute * away_rate)
+            stats[key] = {"home": home, "away": away, "total": home + away}
+        stats["Possession"] = {"home": 52, "away": 48, "total": 100}
+        stats["Minute"] = {"home": minute, "away": minute, "total": minute}
+        goals = stats["Goals"]
+        return {
+            "league": game["league"],
+            "home_team": f"Home {game_id}",
+            "away_team": f"Away {game_id}",
+            "score": f"{goals['home']} x {goals['away']}",
+            "time_text": self._time_text(minute),
+            "minute": minute,
+            "stats": stats,
+            "raw_stats": {},
+        }
+
+
+def _random_condition(rng, rule_id, group_id):
+    key, high_range, low_range = rng.choice(CONDITION_KEYS)
+    if rng.random() < 0.7:
+        operator, value = rng.choice((">=", ">")), rng.randint(*high_range)
+    else:
+        operator, value = rng.choice(("<=", "<")), rng.randint(*low_range)
+    side = "total" if key == "Minute" else rng.choice(SIDES)
+    return RuleCondition(rule_id=rule_id, stat_key=key, side=side, operator=operator, value=value, group_id=group_id)
+
+
+def seed_database(rules: int, users: int, alerts: int, feed: GameFeed, seed: int) -> None:
+    rng = random.Random(seed)
+    db.drop_all()
+    db.create_all()
+    user_ids = []
+    for index in range(users):
+        user = User(
+            username=f"bench{index}",
+            password_hash="x",
+            telegram_token=f"token{index}",
+            telegram_chat_id=str(index),
+            telegram_verified=True,
+        )
+        db.session.add(user)
+        db.session.flush()
+        user_ids.append(user.id)
+    rule_ids = []
+    for index in range(rules):
+        rule = Rule(
+            user_id=rng.choice(user_ids),
+            name=f"Regra {index}",
+            time_limit_min=90,
+            second_half_only=rng.random() < 0.2,
+            alert_on_penalty=rng.random() < 0.1,
+            outcome_red_if_no_green=rng.random() < 0.3,
+            outcome_red_minute=rng.randint(10, 40),
+        )
+        if rng.random() < 0.15:
+            rule.score_home, rule.score_away = rng.randint(0, 1), rng.randint(0, 1)
+        db.session.add(rule)
+        db.session.flush()
+        rule_ids.append(rule.id)
+        for group_id in range(rng.choice((1, 1, 1, 2, 3))):
+            for _ in range(rng.randint(1, 3)):
+                db.session.add(_random_condition(rng, rule.id, group_id))
+        if rng.random() < 0.5:
+            for outcome_type in ("green", "red"):
+                key, high_range, _ = rng.choice(CONDITION_KEYS[:5])
+                db.session.add(
+                    RuleOutcomeCondition(
+                        rule_id=rule.id,
+                        outcome_type=outcome_type,
+                        stat_key=key,
+                        side="total",
+                        operator=">=",
+                        value=rng.randint(1, high_range[0] + 1),
+                    )
+                )
+    db.session.commit()
+
+    game_ids = list(feed.games)
+    rules_by_id = {rule.id: rule for rule in Rule.query.all()}
+    taken = set()
+    for _ in range(min(alerts, len(rule_ids) * len(game_ids))):
+        pair = (rng.choice(rule_ids), rng.choice(game_ids))
+        if pair in taken:
+            continue
+        taken.add(pair)
+        rule = rules_by_id[pair[0]]
+        payload = feed.payload(pair[1])
+        db.session.add(
+            MatchAlert(
+                rule_id=rule.id,
+                user_id=rule.user_id,
+                game_id=pair[1],
+                url=f"https://betsapi.com/r/{pair[1]}/bench",
+                status="pending",
+                alert_minute=payload["minute"],
+                initial_score=payload["score"],
+                last_score=payload["score"],
+                last_score_minute=payload["minute"],
+                initial_stats_json=json.dumps(payload["stats"]),
+                home_team=payload["home_team"],
+                away_team=payload["away_team"],
+            )
+        )
+    db.session.commit()
+
+
+def stub_side_effects(feed: GameFeed, counters: dict) -> None:
+    original_evaluate = worker.evaluate_groups
+
+    def counting_evaluate(groups, stats):
+        counters["evaluations"] += 1
+        return original_evaluate(groups, stats)
+
+    worker.evaluate_groups = counting_evaluate
+    worker.fetch_live_games = lambda session: (feed.listing(), 200)
+    worker.export_alert = lambda *args, **kwargs: None
+    worker.get_match_history = lambda *args, **kwargs: {"h2h": [], "home": [], "away": []}
+
+
+def reset_worker_state() -> None:
+    for state in (
+        worker.SECOND_HALF_BASELINES,
+        worker.HALFTIME_SEEN_AT,
+        worker.HALFTIME_CONFIRMED_AT,
+        worker.PENALTY_LAST_TOTAL,
+        worker.MISSING_SINCE,
+    ):
+        state.clear()
+    worker.PENALTY_ALERTED.clear()
+    worker.COMPILED_RULES.clear()
+    worker.RULE_INDEX.clear()
+    worker.ALERT_INDEX.clear()
+    worker.RULE_SNAPSHOT.invalidate()
+    worker.DEAD_GROUPS.clear()
+    worker.STATS_DIFF.clear()
+    worker.API_ALERT_STATE["last_ok"] = None
+
+
+def run_cycle(engine, snapshots, scheduler) -> dict:
+    snapshots.new_cycle()
+    stages = {}
+    for name, stage in (
+        ("process", lambda: worker.process_live_games(None, engine, snapshots, scheduler)),
+        ("follow", lambda: worker.follow_alerts(engine, snapshots)),
+        ("finalize", lambda: worker.finalize_full_time(engine, snapshots)),
+    ):
+        started = time.perf_counter()
+        stage()
+        stages[name] = time.perf_counter() - started
+    # Com --threads notify e export correm soltos; esperar aqui so para contar as mensagens do ciclo
+    for pending in (worker.NOTIFY, worker.EXPORT):
+        pending.join()
+    db.session.remove()
+    return stages
+
+
+def run_scale(rules: int, args) -> dict:
+    feed = GameFeed(args.games, args.seed)
+    users = args.users or max(1, rules // 10)
+    seed_database(rules, users, args.alerts, feed, args.seed)
+    reset_worker_state()
+    counters = {"queries": 0, "evaluations": 0}
+    stub_side_effects(feed, counters)
+
+    def count_query(*_args, **_kwargs):
+        counters["queries"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", count_query)
+    engine = CannedEngine(feed)
+    snapshots = SnapshotCache(ttl=3600)
+    scheduler = EveryCycleScheduler()
+    timings, queries, evaluations, stages = [], [], [], []
+    try:
+        for _ in range(args.cycles):
+            counters["queries"] = counters["evaluations"] = 0
+            started = time.perf_counter()
+            stages.append(run_cycle(engine, snapshots, scheduler))
+            timings.append(time.perf_counter() - started)
+            queries.append(counters["queries"])
+            evaluations.append(counters["evaluations"])
+            feed.advance()
+        # Memoria medida num ciclo a parte: tracemalloc distorce o tempo
+        tracemalloc.start()
+        run_cycle(engine, snapshots, scheduler)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_query)
+    wall = statistics.median(timings)
+    pairs = len(feed.listing()) * rules
+    return {
+        "rules": rules,
+        "users": users,
+        "games": args.games,
+        "alerts": MatchAlert.query.count(),
+        "cycle_s": round(wall, 4),
+        "stages_s": {name: round(statistics.median(cycle[name] for cycle in stages), 4) for name in stages[0]},
+        "queries": int(statistics.median(queries)),
+        "evaluations": int(statistics.median(evaluations)),
+        "evals_per_s": round(statistics.median(evaluations) / wall) if wall else 0,
+        "pairs_per_s": round(pairs / wall) if wall else 0,
+        "peak_mb": round(peak / 1024 / 1024, 1),
+        # O dispatcher do outbox nao roda no bench: cada mensagem fica como linha pendente
+        "messages": TelegramOutbox.query.count(),
+        "pipeline": worker.pipeline_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", default="10,100,1000")
+    parser.add_argument("--users", type=int, default=0, help="padrao: uma conta a cada 10 regras")
+    parser.add_argument("--alerts", type=int, default=200)
+    parser.add_argument("--games", type=int, default=60)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", default="", help="grava os resultados neste arquivo")
+    parser.add_argument("--threads", action="store_true", help="roda as etapas do worker nas proprias threads")
+    args = parser.parse_args()
+
+    app = create_app()
+    results = []
+    with app.app_context():
+        if args.threads:
+            for stage in worker.STAGES:
+                stage.start(app)
+        header = (
+            f"{'regras':>7} {'ciclo(s)':>9} {'novos':>7} {'acomp.':>7} {'FT':>7} {'queries':>8} "
+            f"{'avaliac.':>9} {'aval/s':>9} {'pares/s':>10} {'pico MB':>8}"
+        )
+        print(header)
+        for rules in [int(value) for value in args.rules.split(",") if value.strip()]:
+            result = run_scale(rules, args)
+            results.append(result)
+            stages = result["stages_s"]
+            print(
+                f"{result['rules']:>7} {result['cycle_s']:>9.3f} {stages['process']:>7.3f} {stages['follow']:>7.3f} "
+                f"{stages['finalize']:>7.3f} {result['queries']:>8} {result['evaluations']:>9} "
+                f"{result['evals_per_s']:>9} {result['pairs_per_s']:>10} {result['peak_mb']:>8}"
+            )
+            sys.stdout.flush()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()